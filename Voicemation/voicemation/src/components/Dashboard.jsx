@@ -2,6 +2,7 @@ import { useState, useRef, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import VoiceInputSimple from '../components/VoiceInputSimple';
 import AnimationPlayer from '../components/AnimationPlayer';
+import { waitForJob } from '../utils/jobs';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001';
 
@@ -123,7 +124,7 @@ export default function Dashboard({ activeConversation, conversations, onUpdateM
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const result = await response.json();
+      const result = await waitForJob(await response.json(), API_URL);
       console.log("Dashboard API Response:", result);
       
       if (result.success && (result.video_url || result.videoUrl)) {
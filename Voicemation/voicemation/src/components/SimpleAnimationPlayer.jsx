@@ -57,6 +57,7 @@ const SimpleAnimationPlayer = ({ videoUrl, isFullscreenMode = false, onToggleFul
       )}
 
       <video
+        key={videoUrl}
         ref={videoRef}
         className={`w-full h-full object-contain ${!isFullscreenMode ? 'cursor-pointer' : ''}`}
         onClick={handleVideoClick}
@@ -67,7 +68,7 @@ const SimpleAnimationPlayer = ({ videoUrl, isFullscreenMode = false, onToggleFul
         muted={!isFullscreenMode}
         preload="metadata"
       >
-        <source src={videoUrl} type="video/mp4" />
+        <source src={videoUrl} type={videoUrl.endsWith('.m3u8') ? 'application/vnd.apple.mpegurl' : 'video/mp4'} />
       </video>
 
       {!isFullscreenMode && !isLoading && (
@@ -2,6 +2,7 @@ import { useState, useEffect, useRef } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import SimpleAnimationPlayer from './SimpleAnimationPlayer';
 import ErrorBoundary from './ErrorBoundary';
+import { waitForJob, canPlayHls } from '../utils/jobs';
 
 // Reusable Button Component for consistent styling
 const ActionButton = ({ onClick, icon, text, variant = 'primary', className = '', initial = {}, animate = {}, delay = 0, testId = '' }) => {
@@ -182,12 +183,28 @@ export default function VoiceInput({ onResult, currentAnimation, isGenerating, o
             throw new Error(`HTTP error! status: ${response.status}`);
           }
 
-          const result = await response.json();
+          // In-depth jobs publish a live playlist once the first scene is ready:
+          // play it right away where the browser supports HLS natively
+          let liveId = null;
+          const onPlaylist = (playlistUrl) => {
+            if (!canPlayHls()) return;
+            liveId = Date.now();
+            setAnimationHistory(prev => [...prev, {
+              id: liveId,
+              videoUrl: playlistUrl,
+              text: 'Voice-generated animation (live)',
+              timestamp: new Date().toLocaleTimeString(),
+              live: true
+            }]);
+            setText('Playing the first scenes while the rest render...');
+          };
+
+          const result = await waitForJob(await response.json(), '', null, onPlaylist);
 
           if (result.video_url && result.video_url.trim()) {
             // Successfully generated animation
             const animationData = {
-              id: Date.now(),
+              id: liveId || Date.now(),
               videoUrl: result.video_url, // Use relative URL since we have proxy
               text: result.text || 'Voice-generated animation', // Use recognized text from backend
               timestamp: new Date().toLocaleTimeString()
@@ -199,7 +216,10 @@ export default function VoiceInput({ onResult, currentAnimation, isGenerating, o
             // Add to animation history with safety check
             try {
               setAnimationHistory(prev => {
-                const newHistory = [...prev, animationData];
+                // The finished video replaces its live playlist entry
+                const newHistory = liveId
+                  ? prev.map(animation => (animation.id === liveId ? animationData : animation))
+                  : [...prev, animationData];
                 console.log('New animation history length:', newHistory.length);
                 console.log('Latest animation video URL:', animationData.videoUrl);
                 return newHistory;
@@ -220,6 +240,9 @@ export default function VoiceInput({ onResult, currentAnimation, isGenerating, o
             }
           } else {
             // Handle error from backend
+            if (liveId) {
+              setAnimationHistory(prev => prev.filter(animation => animation.id !== liveId));
+            }
             const errorMessage = result.error || 'Failed to generate animation - no video URL received';
             console.error('Backend error:', errorMessage);
             setText('');
@@ -1,5 +1,6 @@
 import React, { useState, useCallback, useRef, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
+import { waitForJob } from '../utils/jobs';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001';
 
@@ -100,7 +101,8 @@ const VoiceInputSimple = ({ onResult }) => {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const result = await response.json();
+      setProcessingStatus('Rendering animation...');
+      const result = await waitForJob(await response.json(), API_URL, setProcessingStatus);
       console.log("API Response:", result);
       
       if (result.success && (result.video_url || result.videoUrl)) {
@@ -0,0 +1,107 @@
+// Follows a background render job started by /generate_audio until it finishes.
+// Resolves with the final job payload ({ success, videoUrl, video_url, ... }).
+// onProgress, if given, receives human-readable status updates.
+// onPlaylist, if given, receives the live HLS playlist URL of in-depth jobs as
+// soon as the first scene is playable (later scenes are appended while it plays).
+
+const POLL_INTERVAL_MS = 2000;
+
+const STAGE_LABELS = {
+  llm: 'Writing the explanation...',
+  extract: 'Preparing the animation...',
+  validate: 'Checking the animation...',
+  render: 'Rendering animation...',
+  mux: 'Adding voiceover...',
+};
+
+function describeProgress(scenes) {
+  const entries = Object.values(scenes);
+  const done = entries.reduce((sum, scene) => sum + scene.frames_done, 0);
+  const total = entries.reduce((sum, scene) => sum + scene.frames_total, 0);
+  const percent = total ? Math.round((done / total) * 100) : 0;
+  return `Rendering animation... ${percent}%`;
+}
+
+// Browsers that play HLS in a plain <video> element (Safari, iOS, most Android)
+export function canPlayHls() {
+  if (typeof document === 'undefined') return false;
+  return document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== '';
+}
+
+function playlistUrl(job, apiUrl) {
+  const url = job.playlistUrl || job.playlist_url;
+  return url ? `${apiUrl}${url}` : null;
+}
+
+function followEvents(statusUrl, apiUrl, onProgress, onPlaylist) {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`${statusUrl}/events`);
+
+    source.addEventListener('stage', (event) => {
+      const { stage } = JSON.parse(event.data);
+      if (onProgress && STAGE_LABELS[stage]) onProgress(STAGE_LABELS[stage]);
+    });
+    source.addEventListener('progress', (event) => {
+      const { scenes } = JSON.parse(event.data);
+      if (onProgress) onProgress(describeProgress(scenes));
+    });
+    source.addEventListener('playlist', (event) => {
+      const url = playlistUrl(JSON.parse(event.data), apiUrl);
+      if (onPlaylist && url) onPlaylist(url);
+    });
+    source.addEventListener('done', (event) => {
+      source.close();
+      resolve(JSON.parse(event.data));
+    });
+    source.addEventListener('failed', (event) => {
+      source.close();
+      resolve(JSON.parse(event.data));
+    });
+    source.onerror = () => {
+      // Closed before a final event - let the caller fall back to polling
+      if (source.readyState === EventSource.CLOSED) {
+        reject(new Error('Event stream closed'));
+      }
+    };
+  });
+}
+
+async function pollJob(statusUrl, apiUrl, onPlaylist) {
+  let announced = false;
+  while (true) {
+    await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+
+    const response = await fetch(statusUrl);
+    if (!response.ok && response.status !== 404) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const job = await response.json();
+    const url = playlistUrl(job, apiUrl);
+    if (onPlaylist && url && !announced) {
+      announced = true;
+      onPlaylist(url);
+    }
+    if (job.status === 'done' || job.status === 'failed' || !job.success) {
+      return job;
+    }
+  }
+}
+
+export async function waitForJob(result, apiUrl = '', onProgress = null, onPlaylist = null) {
+  // Older servers answered synchronously with the video URL
+  if (!result.jobId && !result.job_id) {
+    return result;
+  }
+
+  const statusUrl = `${apiUrl}${result.statusUrl || result.status_url}`;
+
+  if (typeof EventSource !== 'undefined') {
+    try {
+      return await followEvents(statusUrl, apiUrl, onProgress, onPlaylist);
+    } catch (error) {
+      console.warn('Job event stream unavailable, polling instead:', error);
+    }
+  }
+  return pollJob(statusUrl, apiUrl, onPlaylist);
+}
@@ -14,6 +14,10 @@ export default defineConfig({
         target: 'http://localhost:5001',
         changeOrigin: true,
       },
+      '/jobs': {
+        target: 'http://localhost:5001',
+        changeOrigin: true,
+      },
       '/video': {
         target: 'http://localhost:5001',
         changeOrigin: true,
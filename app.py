@@ -1,9 +1,15 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, Response
 from flask_cors import CORS
 import os
-import tempfile
+import json
 import subprocess
+import threading
 from voicemation import process_speech  # existing pipeline
+from job_utils import JobQueue, QueueFullError, DONE, FAILED
+from metrics_utils import timed, render_prometheus
+from workspace_utils import WORKSPACE_ROOT, create_workspace
+from audio_utils import decode_to_pcm, ASR_SAMPLE_RATE, ASR_SAMPLE_WIDTH
+from asr_utils import recognize_speech
 import speech_recognition as sr
 from dotenv import load_dotenv
 
@@ -25,7 +31,60 @@ CORS(app, resources={
     }
 })
 
-OUTPUT_VIDEO = None  # store the latest video path
+OUTPUT_VIDEO = None  # store the latest video path (legacy /download)
+_output_lock = threading.Lock()
+
+SSE_HEARTBEAT_SECONDS = 15  # keeps proxies from closing idle event streams
+
+# Background pool that runs process_speech so requests return immediately
+job_queue = JobQueue()
+
+
+def run_pipeline_job(job_id, speech_text, in_depth_mode):
+    """Job body: run the pipeline and remember the result for /download."""
+    global OUTPUT_VIDEO
+    shipped = {}  # this job's preview and final paths
+
+    def on_progress(**fields):
+        global OUTPUT_VIDEO
+        if fields.get("final"):
+            with _output_lock:
+                shipped["final"] = fields["final"]
+                # The final render replaces this job's preview - unless a newer job has shipped since
+                if shipped.get("preview") and OUTPUT_VIDEO == shipped["preview"]:
+                    OUTPUT_VIDEO = fields["final"]
+        job_queue.update(job_id, **fields)
+
+    print(f"🚀 Calling process_speech('{speech_text}', {in_depth_mode})")
+    video_path = process_speech(
+        speech_text, in_depth_mode, workspace=create_workspace(job_id), on_progress=on_progress
+    )
+    print(f"🎬 process_speech returned: {video_path}")
+    if video_path:
+        with _output_lock:
+            shipped["preview"] = video_path
+            OUTPUT_VIDEO = shipped.get("final", video_path)
+    return video_path
+
+
+def submit_pipeline_job(speech_text, in_depth_mode):
+    """Queue a pipeline run and build the 202 response pointing at /jobs/<id>."""
+    try:
+        job_id = job_queue.submit(run_pipeline_job, speech_text, in_depth_mode)
+    except QueueFullError:
+        return jsonify({"success": False, "error": "Server is busy, please try again shortly"}), 503
+    job_queue.update(job_id, prompt=speech_text, in_depth_mode=in_depth_mode)
+
+    status_url = f"/jobs/{job_id}"
+    return jsonify({
+        "success": True,
+        "jobId": job_id,
+        "job_id": job_id,
+        "statusUrl": status_url,
+        "status_url": status_url,
+        "prompt": speech_text,
+        "text": speech_text
+    }), 202
 
 
 @app.route("/")
@@ -36,43 +95,170 @@ def index():
 # Existing text-based route (optional)
 @app.route("/generate", methods=["POST"])
 def generate():
-    global OUTPUT_VIDEO
     data = request.get_json()
     text = data.get("text", "")
 
     if not text.strip():
         return jsonify({"error": "No text provided"}), 400
 
-    OUTPUT_VIDEO = process_speech(text, False)  # Default to normal mode for this endpoint
-
-    if OUTPUT_VIDEO:
-        return jsonify({"message": "Video generated!", "video_url": "/download"})
-    else:
-        return jsonify({"error": "Failed to generate video"}), 500
+    return submit_pipeline_job(text, False)  # Default to normal mode for this endpoint
 
 
 @app.route("/download")
 def download():
-    global OUTPUT_VIDEO
     if OUTPUT_VIDEO and os.path.exists(OUTPUT_VIDEO):
-        return send_file(OUTPUT_VIDEO, as_attachment=False, mimetype='video/mp4')
+        # "Latest video" changes between jobs - let clients revalidate via ETag
+        response = send_file(OUTPUT_VIDEO, as_attachment=False, mimetype='video/mp4', conditional=True, etag=True)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
     return "No video generated yet.", 404
 
 
+def job_payload(job):
+    """Client-facing view of a job (shared by polling and the event stream)"""
+    payload = {
+        "success": job["status"] != FAILED,
+        "jobId": job["id"],
+        "status": job["status"],
+        "prompt": job.get("prompt"),
+        "text": job.get("prompt"),
+    }
+    if job.get("playlist"):
+        # Live HLS playlist, playable while later scenes are still rendering
+        playlist_url = f"/video/{job['playlist']}"
+        payload["playlistUrl"] = playlist_url
+        payload["playlist_url"] = playlist_url
+    if job["status"] == DONE:
+        # videoUrl is the best version so far: the preview, then the final render
+        preview_url = f"/video/{job['result']}"
+        video_url = f"/video/{job['final']}" if job.get("final") else preview_url
+        payload["videoUrl"] = video_url
+        payload["video_url"] = video_url  # Keep both for compatibility
+        payload["previewUrl"] = preview_url
+        payload["preview_url"] = preview_url
+        if job.get("final"):
+            payload["finalUrl"] = video_url
+            payload["final_url"] = video_url
+        if job.get("final_status"):
+            payload["finalStatus"] = job["final_status"]  # rendering / done / failed / skipped
+    elif job["status"] == FAILED:
+        payload["error"] = job.get("error") or "Failed to generate video"
+    return payload
+
+
+def job_events(previous, job):
+    """SSE (event, data) pairs describing what changed between two job snapshots"""
+    events = []
+    if job.get("stage") and job.get("stage") != previous.get("stage"):
+        events.append(("stage", {"stage": job["stage"]}))
+    if job.get("scenes") and job.get("scenes") != previous.get("scenes"):
+        events.append(("progress", {"scenes": job["scenes"]}))
+    if job.get("playlist") and not previous.get("playlist"):
+        events.append(("playlist", job_payload(job)))
+    if job["status"] != previous.get("status"):
+        event = job["status"] if job["status"] in (DONE, FAILED) else "status"
+        events.append((event, job_payload(job)))
+    if job["status"] == DONE and job.get("final_status") in ("done", "failed") \
+            and job.get("final_status") != previous.get("final_status"):
+        events.append(("final", job_payload(job)))
+    return events
+
+
+def job_settled(job):
+    """True once nothing more will happen to a job (including its final render)"""
+    return job["status"] in (DONE, FAILED) and job.get("final_status") != "rendering"
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Report job status and, once finished, the video URL"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown job"}), 404
+    return jsonify(job_payload(job))
+
+
+@app.route("/jobs/<job_id>/events")
+def job_event_stream(job_id):
+    """
+    Server-Sent Events stream of stage transitions, per-scene frame progress,
+    the preview URL and, once the background render finishes, the final URL.
+    Subscribers sleep on the job queue's condition variable, so under the
+    gevent worker (see Procfile) an idle stream costs a greenlet rather than
+    a worker thread.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown job"}), 404
+
+    def stream(job):
+        previous = {}
+        yield "retry: 3000\n\n"
+        while True:
+            for event, data in job_events(previous, job):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            if job_settled(job):
+                return
+            previous = job
+            job = job_queue.wait_for_update(job_id, job["updated_at"], SSE_HEARTBEAT_SECONDS)
+            if job is None:
+                yield f"event: failed\ndata: {json.dumps({'success': False, 'error': 'Unknown job'})}\n\n"
+                return
+            if job["updated_at"] == previous["updated_at"]:
+                yield ": keep-alive\n\n"
+
+    return Response(stream(job), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # don't let nginx buffer the stream
+    })
+
+
+@app.route("/metrics")
+def metrics():
+    """Per-stage latency histograms, payload sizes and cache counters (Prometheus format)"""
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+VIDEO_MIMETYPES = {
+    ".mp4": "video/mp4",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+
+
 @app.route("/video/<path:filename>")
 def serve_video(filename):
-    """Serve video files from the media directory"""
+    """
+    Serve video files from the media directory.
+    Supports Range (206), ETag and Last-Modified validation so seeking doesn't
+    re-download the file. Per-job workspace outputs never change once written,
+    so they are cached as immutable.
+    """
     video_path = os.path.join(os.getcwd(), filename)
-    if os.path.exists(video_path):
-        return send_file(video_path, as_attachment=False, mimetype='video/mp4')
-    return "Video not found.", 404
+    if not os.path.exists(video_path):
+        return "Video not found.", 404
+
+    extension = os.path.splitext(filename)[1].lower()
+    mimetype = VIDEO_MIMETYPES.get(extension, 'video/mp4')
 
+    # send_from_directory refuses paths that escape the server root
+    response = send_from_directory(
+        os.getcwd(), filename, as_attachment=False, mimetype=mimetype, conditional=True, etag=True
+    )
+    workspace_root = os.path.abspath(WORKSPACE_ROOT) + os.sep
+    if extension == ".m3u8":
+        # Live playlists grow while scenes render
+        response.headers["Cache-Control"] = "no-cache"
+    elif os.path.abspath(video_path).startswith(workspace_root):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    return response
 
-# NEW: Voice-only route with WebM -> WAV conversion
+
+# NEW: Voice-only route with WebM -> PCM conversion
 @app.route("/generate_audio", methods=["POST"])
 def generate_audio():
-    global OUTPUT_VIDEO
-    
     # Handle JSON text input
     if request.is_json:
         data = request.get_json()
@@ -92,28 +278,15 @@ def generate_audio():
         in_depth_mode = in_depth_mode_str.lower() == "true"
         print(f"🔍 FormData inDepthMode: '{in_depth_mode_str}' -> {in_depth_mode}")
 
-        # Save WebM temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp_webm:
-            audio_file.save(tmp_webm.name)
-            webm_path = tmp_webm.name
-
-        # Convert WebM -> WAV using ffmpeg
-        wav_fd, wav_path = tempfile.mkstemp(suffix=".wav")
-        os.close(wav_fd)  # Close fd so ffmpeg can write
-
         try:
-            subprocess.run(
-                ["ffmpeg", "-y", "-i", webm_path, wav_path],
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
-
-            # Recognize speech
-            recognizer = sr.Recognizer()
-            with sr.AudioFile(wav_path) as source:
-                audio_data = recognizer.record(source)
-                speech_text = recognizer.recognize_google(audio_data)
+            # Stream WebM through ffmpeg straight to 16 kHz mono PCM in memory
+            with timed("audio_decode"):
+                pcm = decode_to_pcm(audio_file.stream)
+
+            # Recognize speech (engine picked by VOICEMATION_ASR_ENGINE)
+            with timed("asr"):
+                audio_data = sr.AudioData(pcm, ASR_SAMPLE_RATE, ASR_SAMPLE_WIDTH)
+                speech_text = recognize_speech(audio_data)
                 
             print(f"🎤 Recognized speech: {speech_text}")
 
@@ -123,36 +296,11 @@ def generate_audio():
             return jsonify({"success": False, "error": "Speech recognition service unavailable"}), 503
         except subprocess.CalledProcessError:
             return jsonify({"success": False, "error": "Failed to convert audio"}), 500
-        finally:
-            os.remove(webm_path)
-            os.remove(wav_path)
     else:
         return jsonify({"success": False, "error": "No audio file or text provided"}), 400
 
-    # Call existing pipeline
-    try:
-        print(f"🚀 Calling process_speech('{speech_text}', {in_depth_mode})")
-        OUTPUT_VIDEO = process_speech(speech_text, in_depth_mode)
-        print(f"🎬 process_speech returned: {OUTPUT_VIDEO}")
-    except Exception as e:
-        print(f"❌ Error in process_speech: {str(e)}")
-        print(f"❌ Error type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({"success": False, "error": f"Pipeline error: {str(e)}"}), 500
-
-    if OUTPUT_VIDEO:
-        # Return the relative path from the server root for the frontend
-        video_url = f"/video/{OUTPUT_VIDEO}"
-        return jsonify({
-            "success": True,
-            "videoUrl": video_url, 
-            "prompt": speech_text,
-            "video_url": video_url,  # Keep both for compatibility
-            "text": speech_text      # Keep both for compatibility
-        })
-    else:
-        return jsonify({"success": False, "error": "Failed to generate video"}), 500
+    # Hand off to the background pipeline; clients poll /jobs/<id>
+    return submit_pipeline_job(speech_text, in_depth_mode)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+# asr_utils.py
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import speech_recognition as sr
+from audio_utils import ASR_SAMPLE_RATE
+from metrics_utils import observe
+
+
+# "google" (network, default) or "local" (CPU inference, no network round trip)
+ASR_ENGINE = os.environ.get("VOICEMATION_ASR_ENGINE", "google")
+# torchaudio pipeline bundle used by the local engine
+ASR_MODEL = os.environ.get("VOICEMATION_ASR_MODEL", "WAV2VEC2_ASR_BASE_960H")
+ASR_THREADS = int(os.environ.get("VOICEMATION_ASR_THREADS", "4"))
+# Concurrent requests are collected into one forward pass of up to this many clips...
+ASR_BATCH_SIZE = int(os.environ.get("VOICEMATION_ASR_BATCH_SIZE", "8"))
+# ...waiting at most this long for more clips to join the batch
+ASR_BATCH_WAIT_SECONDS = float(os.environ.get("VOICEMATION_ASR_BATCH_WAIT_MS", "25")) / 1000
+
+
+def _run_off_hub(fn, *args):
+    """
+    Run CPU-bound work on a real OS thread when gevent has patched threading,
+    so inference doesn't stall every other greenlet (SSE streams, polling, ...).
+    """
+    try:
+        from gevent import monkey, get_hub
+    except ImportError:
+        return fn(*args)
+    if monkey.is_module_patched("threading"):
+        return get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+
+def audio_to_samples(audio_data):
+    """float32 mono samples at ASR_SAMPLE_RATE from an sr.AudioData"""
+    pcm = audio_data.get_raw_data(convert_width=2)
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    if audio_data.sample_rate != ASR_SAMPLE_RATE:
+        import librosa
+        samples = librosa.resample(samples, orig_sr=audio_data.sample_rate, target_sr=ASR_SAMPLE_RATE)
+    return samples
+
+
+class RecognizerEngine:
+    """
+    Speech-to-text backend. transcribe() takes an sr.AudioData and returns the
+    text, raising sr.UnknownValueError when nothing intelligible was said and
+    sr.RequestError when the engine itself is unavailable.
+    """
+
+    name = "base"
+
+    def transcribe(self, audio_data):
+        raise NotImplementedError
+
+
+class GoogleEngine(RecognizerEngine):
+    """Google Web Speech API via speech_recognition (network round trip)."""
+
+    name = "google"
+
+    def transcribe(self, audio_data):
+        return sr.Recognizer().recognize_google(audio_data)
+
+
+class LocalEngine(RecognizerEngine):
+    """
+    wav2vec2 CTC model from torchaudio, run on the CPU with greedy decoding.
+
+    Requests from concurrent threads/greenlets go through a queue; a single
+    batching thread pads whatever arrived within ASR_BATCH_WAIT_SECONDS into
+    one forward pass, so throughput scales with cores instead of requests.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name=ASR_MODEL, threads=ASR_THREADS,
+                 batch_size=ASR_BATCH_SIZE, batch_wait=ASR_BATCH_WAIT_SECONDS):
+        self.model_name = model_name
+        self.threads = threads
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self._model = None
+        self._labels = None
+        self._load_error = None
+        self._load_lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._batcher = None
+
+    def transcribe(self, audio_data):
+        self._ensure_loaded()
+        future = Future()
+        self._requests.put((audio_to_samples(audio_data), future))
+        text = future.result()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def _ensure_loaded(self):
+        with self._load_lock:
+            if self._model is None and self._load_error is None:
+                try:
+                    import torch
+                    import torchaudio
+                    torch.set_num_threads(self.threads)
+                    bundle = getattr(torchaudio.pipelines, self.model_name)
+                    self._model = bundle.get_model().eval()
+                    self._labels = bundle.get_labels()
+                    print(f"🎙️ Local ASR model {self.model_name} loaded ({self.threads} threads)")
+                except Exception as e:
+                    self._load_error = f"{type(e).__name__}: {e}"
+            if self._load_error:
+                raise sr.RequestError(f"Local speech recognition unavailable ({self._load_error})")
+            if self._batcher is None:
+                self._batcher = threading.Thread(target=self._batch_loop, name="asr-batcher", daemon=True)
+                self._batcher.start()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._requests.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._requests.get(timeout=self.batch_wait))
+                except queue.Empty:
+                    break
+
+            observe("voicemation_asr_batch_size", len(batch),
+                    help_text="Clips per local ASR forward pass",
+                    buckets=(1, 2, 4, 8, 16, 32))
+            try:
+                texts = _run_off_hub(self._infer, [samples for samples, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(sr.RequestError(f"Local speech recognition failed ({e})"))
+                continue
+            for (_, future), text in zip(batch, texts):
+                future.set_result(text)
+
+    def _infer(self, clips):
+        import torch
+
+        lengths = torch.tensor([len(clip) for clip in clips])
+        waveforms = torch.zeros(len(clips), int(lengths.max()))
+        for i, clip in enumerate(clips):
+            waveforms[i, :len(clip)] = torch.from_numpy(clip)
+
+        with torch.inference_mode():
+            emissions, frame_lengths = self._model(waveforms, lengths)
+        tokens = emissions.argmax(dim=-1)
+
+        texts = []
+        for i in range(len(clips)):
+            frames = tokens[i, :int(frame_lengths[i])] if frame_lengths is not None else tokens[i]
+            texts.append(self._decode(frames.tolist()))
+        return texts
+
+    def _decode(self, token_ids):
+        """Greedy CTC: collapse repeats, drop blanks, '|' separates words"""
+        chars = []
+        previous = None
+        for token_id in token_ids:
+            if token_id != previous and token_id != 0:  # 0 is the CTC blank
+                chars.append(self._labels[token_id])
+            previous = token_id
+        return "".join(chars).replace("|", " ").strip().lower()
+
+
+ENGINES = {
+    "google": GoogleEngine,
+    "local": LocalEngine,
+}
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """The configured RecognizerEngine (created once per process)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            engine_class = ENGINES.get(ASR_ENGINE)
+            if engine_class is None:
+                raise ValueError(f"Unknown VOICEMATION_ASR_ENGINE {ASR_ENGINE!r} (expected one of {sorted(ENGINES)})")
+            _engine = engine_class()
+        return _engine
+
+
+def recognize_speech(audio_data):
+    """Transcribe an sr.AudioData with the configured engine."""
+    return get_engine().transcribe(audio_data)
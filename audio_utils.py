@@ -0,0 +1,51 @@
+# audio_utils.py
+
+import shutil
+import subprocess
+import threading
+
+
+# Speech recognizers want 16 kHz mono 16-bit PCM - decode straight to that
+ASR_SAMPLE_RATE = 16000
+ASR_SAMPLE_WIDTH = 2  # bytes (s16le)
+_CHUNK_BYTES = 64 * 1024
+
+
+def decode_to_pcm(stream, sample_rate=ASR_SAMPLE_RATE):
+    """
+    Decode an uploaded recording (WebM, Ogg, WAV, ...) to mono s16le PCM bytes.
+    The upload is piped into ffmpeg's stdin and the PCM read back from its
+    stdout, so nothing is written to disk. Raises subprocess.CalledProcessError
+    if ffmpeg can't decode it.
+    """
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # Feed stdin from a thread so a full stdout pipe can never deadlock us
+    def feed():
+        try:
+            shutil.copyfileobj(stream, process.stdin, _CHUNK_BYTES)
+        except OSError:
+            pass  # ffmpeg stopped reading; its exit status says why
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    pcm = process.stdout.read()
+    errors = process.stderr.read()  # small: -loglevel error
+    process.wait()
+    feeder.join()
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, output=b"", stderr=errors)
+    return pcm
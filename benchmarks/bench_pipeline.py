@@ -0,0 +1,382 @@
+"""
+End-to-end pipeline benchmark that replays recorded GPT responses.
+
+Usage:
+    python benchmarks/bench_pipeline.py                          # every fixture once, one at a time
+    python benchmarks/bench_pipeline.py --jobs 12 --concurrency 4
+    python benchmarks/bench_pipeline.py --json results.json      # machine-readable results
+    python benchmarks/bench_pipeline.py --baseline results.json  # exit 1 on a regression
+    python benchmarks/bench_pipeline.py --record                 # re-record fixtures from GPT
+    python benchmarks/bench_pipeline.py --llm-endpoint http://127.0.0.1:8089/v1
+
+GPT is replaced by a backend that answers from benchmarks/fixtures.json
+(or, with --llm-endpoint, by an OpenAI-compatible server such as
+benchmarks/llm_server.py, which exercises the real HTTP client), and
+gTTS by an ffmpeg tone as long as the sentence would take to say, so runs
+need no network and can be repeated. Everything else is the real
+process_speech path: sanitize, extract, dry run, Manim renders, TTS
+stitching, scene fitting and muxing. Caches and workspaces live in a
+throwaway directory, so every job does the full work.
+
+CPU time counts this process plus the subprocesses it has reaped (ffmpeg,
+Manim CLI renders). Warm Manim workers stay alive for the whole run, so
+pass --cold-manim when render CPU matters.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_PATH = os.path.join(BENCH_DIR, "fixtures.json")
+sys.path.insert(0, ROOT)
+
+from llm_utils import LLMBackend, LLMError  # noqa: E402
+
+# Relative regressions smaller than this many seconds are noise for fast stages
+MIN_DELTA_SECONDS = 0.05
+
+
+def load_fixtures(path):
+    with open(path, "r", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    for fixture in fixtures:
+        fixture["path"] = os.path.join(os.path.dirname(path), fixture["response"])
+    return fixtures
+
+
+def _normalize(text):
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+class ReplayBackend(LLMBackend):
+    """
+    LLM backend that answers from recorded responses. Requests are matched on
+    the start of the user message (in-depth mode appends its instructions to
+    the prompt); replay-only fixtures answer the scene plan and per-scene
+    calls of in-depth jobs. Repair requests get their code back unchanged.
+    tokens_per_second > 0 adds generation latency (~4 characters per token)
+    so LLM-bound changes show up in the numbers.
+    """
+
+    name = "replay"
+    PIECE_CHARS = 16  # ~4 tokens per streamed piece
+
+    def __init__(self, fixtures, tokens_per_second=0.0):
+        super().__init__(endpoint="replay")
+        self.tokens_per_second = tokens_per_second
+        self.responses = []  # (normalized prompt, response text)
+        for fixture in fixtures:
+            with open(fixture["path"], "r", encoding="utf-8") as f:
+                self.responses.append((_normalize(fixture["prompt"]), f.read()))
+
+    def find(self, user):
+        if user.startswith("```python"):
+            return user.split("\n\nRunning it fails with:")[0]
+        text = _normalize(user)
+        for prompt, response in self.responses:
+            if text.startswith(prompt):
+                return response
+        return None
+
+    def generation_seconds(self, response):
+        return len(response) / 4 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def complete(self, system, user, max_tokens, temperature, top_p, timeout):
+        response = self.find(user)
+        if response is None:
+            raise LLMError(f"No recorded response for {user[:60]!r}", 404)
+        time.sleep(min(self.generation_seconds(response), timeout))
+        return response
+
+    def pieces(self, response):
+        """The response in token-sized pieces, paced like generation"""
+        delay = self.generation_seconds(response[:self.PIECE_CHARS])
+        for start in range(0, len(response), self.PIECE_CHARS):
+            time.sleep(delay)
+            yield response[start:start + self.PIECE_CHARS]
+
+    def stream(self, system, user, max_tokens, temperature, top_p, timeout):
+        response = self.find(user)
+        if response is None:
+            raise LLMError(f"No recorded response for {user[:60]!r}", 404)
+        yield from self.pieces(response)
+
+
+class ToneTTS:
+    """Stand-in for gTTS: a quiet tone lasting as long as the text would take to say."""
+
+    WORDS_PER_SECOND = 2.5
+
+    def __init__(self, text, lang="en", **kwargs):
+        self.text = text
+
+    def save(self, path):
+        seconds = max(0.5, len(self.text.split()) / self.WORDS_PER_SECOND)
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error",
+             "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=24000:duration={seconds:.2f}",
+             "-af", "volume=0.1", "-ac", "1", "-c:a", "libmp3lame", "-b:a", "32k", path],
+            check=True, capture_output=True
+        )
+
+
+def record_fixtures(fixtures):
+    """
+    Ask GPT for every fixture prompt and overwrite its recorded response.
+    Replay-only fixtures (scene plans and scenes) are kept as they are - their
+    prompts depend on the plan they belong to.
+    """
+    import voicemation
+    for fixture in fixtures:
+        if fixture.get("replay_only"):
+            continue
+        print(f"🎙️ Recording {fixture['response']} ({fixture['prompt']!r})")
+        response = voicemation.get_gpt_response(fixture["prompt"], fixture["in_depth"])
+        with open(fixture["path"], "w", encoding="utf-8") as f:
+            f.write(response)
+
+
+def run_job(index, fixture, wait_for_final, final_timeout):
+    import voicemation
+
+    final_done = threading.Event()
+    final = {}
+
+    def on_progress(**fields):
+        if fields.get("final_status") in ("done", "failed", "skipped"):
+            final.update(fields)
+            final_done.set()
+
+    result = {"index": index, "prompt": fixture["prompt"], "in_depth": fixture["in_depth"], "error": None}
+    start = time.perf_counter()
+    try:
+        video_path = voicemation.process_speech(fixture["prompt"], fixture["in_depth"], on_progress=on_progress)
+    except Exception as e:
+        video_path = None
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["preview_seconds"] = time.perf_counter() - start
+
+    if video_path and wait_for_final and not final_done.wait(final_timeout):
+        final["final_status"] = "timeout"
+    result["seconds"] = time.perf_counter() - start
+    result["ok"] = bool(video_path) and (not wait_for_final or final.get("final_status") == "done")
+    if video_path and not result["ok"] and not result["error"]:
+        result["error"] = f"final render {final.get('final_status')}"
+    elif not video_path and not result["error"]:
+        result["error"] = "no video"
+    result["video_bytes"] = os.path.getsize(video_path) if video_path else 0
+    if final.get("final"):
+        result["final_bytes"] = os.path.getsize(final["final"])
+    return result
+
+
+def stage_table(before, after):
+    """
+    Per-stage wall/CPU totals recorded between two metrics snapshots. Stages
+    recorded with more labels (e.g. scene_render per tier) get one row per
+    label set, named like scene_render[tier=final].
+    """
+    stages = {}
+    for metric, field in (("voicemation_stage_seconds", "wall"), ("voicemation_stage_cpu_seconds", "cpu")):
+        for (name, labels), (total, count) in after["histograms"].items():
+            if name != metric:
+                continue
+            previous_total, previous_count = before["histograms"].get((name, labels), (0.0, 0))
+            count -= previous_count
+            if count <= 0:
+                continue
+            stage = dict(labels).get("stage", "?")
+            extra = ",".join(f"{key}={value}" for key, value in labels if key != "stage")
+            if extra:
+                stage = f"{stage}[{extra}]"
+            entry = stages.setdefault(stage, {"count": count})
+            entry[f"{field}_seconds_total"] = round(total - previous_total, 4)
+            entry[f"{field}_seconds_mean"] = round((total - previous_total) / count, 4)
+    return dict(sorted(stages.items()))
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * fraction)) - 1)]
+
+
+def summarize(results, makespan, cpu_seconds):
+    succeeded = [r for r in results if r["ok"]]
+    durations = [r["seconds"] for r in succeeded] or [0.0]
+    return {
+        "jobs": len(results),
+        "failed": len(results) - len(succeeded),
+        "makespan_seconds": round(makespan, 3),
+        "jobs_per_hour": round(len(succeeded) / makespan * 3600, 2) if makespan else 0.0,
+        "job_seconds_p50": round(statistics.median(durations), 3),
+        "job_seconds_p95": round(_percentile(durations, 0.95), 3),
+        "preview_seconds_p50": round(statistics.median([r["preview_seconds"] for r in succeeded] or [0.0]), 3),
+        "cpu_seconds": round(cpu_seconds, 3),
+        "cpu_seconds_per_job": round(cpu_seconds / len(results), 3) if results else 0.0,
+        "video_bytes_mean": int(statistics.mean([r["video_bytes"] for r in succeeded] or [0])),
+    }
+
+
+def find_regressions(report, baseline, tolerance, min_delta=MIN_DELTA_SECONDS):
+    """Human-readable list of metrics that got worse than baseline allows"""
+    regressions = []
+    current, previous = report["summary"], baseline["summary"]
+
+    if current["failed"] > previous["failed"]:
+        regressions.append(f"failed jobs {previous['failed']} -> {current['failed']}")
+    if current["jobs_per_hour"] < previous["jobs_per_hour"] * (1 - tolerance):
+        regressions.append(f"jobs/hour {previous['jobs_per_hour']} -> {current['jobs_per_hour']}")
+    for key in ("job_seconds_p50", "preview_seconds_p50", "cpu_seconds_per_job"):
+        if current[key] > previous[key] * (1 + tolerance) and current[key] - previous[key] > min_delta:
+            regressions.append(f"{key} {previous[key]} -> {current[key]}")
+
+    for stage, stats in report["stages"].items():
+        old = baseline["stages"].get(stage)
+        if not old or "wall_seconds_mean" not in old:
+            continue
+        new_mean, old_mean = stats.get("wall_seconds_mean", 0.0), old["wall_seconds_mean"]
+        if new_mean > old_mean * (1 + tolerance) and new_mean - old_mean > min_delta:
+            regressions.append(f"stage {stage} wall {old_mean}s -> {new_mean}s")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'stage':<28} {'runs':>5} {'wall mean s':>12} {'cpu mean s':>11} {'wall total s':>13}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<28} {stats['count']:>5} {stats.get('wall_seconds_mean', 0):>12.3f} "
+              f"{stats.get('cpu_seconds_mean', 0):>11.3f} {stats.get('wall_seconds_total', 0):>13.3f}")
+    for result in report["jobs"]:
+        if not result["ok"]:
+            print(f"❌ job {result['index']} ({result['prompt']!r}): {result['error']}")
+
+    summary = report["summary"]
+    print()
+    print(f"📊 {summary['jobs']} jobs at concurrency {report['config']['concurrency']}, {summary['failed']} failed")
+    print(f"⏱️ p50 {summary['job_seconds_p50']:.2f}s, p95 {summary['job_seconds_p95']:.2f}s per job "
+          f"(preview p50 {summary['preview_seconds_p50']:.2f}s), makespan {summary['makespan_seconds']:.1f}s")
+    print(f"🚀 {summary['jobs_per_hour']:.1f} jobs/hour, {summary['cpu_seconds_per_job']:.1f} CPU s/job, "
+          f"{summary['video_bytes_mean'] / 1024:.0f} KiB mean video")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=FIXTURES_PATH, help="fixture manifest (default: benchmarks/fixtures.json)")
+    parser.add_argument("--only", help="regex on fixture prompts to run")
+    parser.add_argument("--jobs", type=int, help="jobs to run, cycling through the fixtures (default: one per fixture)")
+    parser.add_argument("--concurrency", type=int, default=1, help="jobs in flight at once")
+    parser.add_argument("--final", action="store_true", help="also wait for the final-quality render")
+    parser.add_argument("--final-timeout", type=float, default=1800, help="seconds to wait for a final render")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0,
+                        help="simulated GPT generation speed (default: instant)")
+    parser.add_argument("--llm-endpoint", help="use this OpenAI-compatible server instead of in-process replay")
+    parser.add_argument("--cold-manim", action="store_true", help="render with the Manim CLI instead of warm workers")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="results file to compare against; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown vs. the baseline")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the workspaces and caches afterwards")
+    parser.add_argument("--record", action="store_true", help="re-record every fixture from GPT, then exit")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own logging")
+    args = parser.parse_args()
+
+    all_fixtures = load_fixtures(args.fixtures)
+    fixtures = [f for f in all_fixtures if not f.get("replay_only")]
+    if args.only:
+        fixtures = [f for f in fixtures if re.search(args.only, f["prompt"], re.IGNORECASE)]
+    if not fixtures:
+        sys.exit("No fixtures to run")
+
+    # Configure the pipeline before it is imported - its settings are read at import time
+    workdir = tempfile.mkdtemp(prefix="voicemation-bench-")
+    os.environ["VOICEMATION_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["VOICEMATION_WORKSPACE_DIR"] = os.path.join(workdir, "workspaces")
+    os.environ["VOICEMATION_FINAL_RENDER"] = "1" if args.final else "0"
+    if args.cold_manim:
+        os.environ["VOICEMATION_WARM_MANIM"] = "0"
+
+    try:
+        if args.record:
+            record_fixtures(fixtures)
+            return
+
+        import llm_utils
+        import metrics_utils
+        import voicemation
+        import voiceover_utils
+
+        if args.llm_endpoint:
+            llm_utils.set_backend(llm_utils.OpenAIBackend(args.llm_endpoint))
+        else:
+            llm_utils.set_backend(ReplayBackend(all_fixtures, args.llm_tokens_per_second))
+        voiceover_utils.gTTS = ToneTTS
+
+        jobs = [fixtures[i % len(fixtures)] for i in range(args.jobs or len(fixtures))]
+        print(f"🏁 {len(jobs)} jobs, concurrency {args.concurrency}, Manim {voicemation.get_manim_version()}")
+
+        before = metrics_utils.snapshot()
+        cpu_start = os.times()
+        start = time.perf_counter()
+        log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with log, ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="bench-job") as pool:
+            results = list(pool.map(
+                lambda job: run_job(job[0], job[1], args.final, args.final_timeout), enumerate(jobs)
+            ))
+        makespan = time.perf_counter() - start
+        cpu_end = os.times()
+        cpu_seconds = sum(cpu_end[:4]) - sum(cpu_start[:4])  # user, system, children user, children system
+
+        report = {
+            "config": {
+                "jobs": len(jobs),
+                "concurrency": args.concurrency,
+                "final": args.final,
+                "llm": args.llm_endpoint or "replay",
+                "llm_tokens_per_second": args.llm_tokens_per_second,
+                "warm_manim": voicemation.WARM_MANIM,
+                "manim_version": voicemation.get_manim_version(),
+                "cpu_count": voicemation.available_cpu_count(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "summary": summarize(results, makespan, cpu_seconds),
+            "stages": stage_table(before, metrics_utils.snapshot()),
+            "jobs": results,
+        }
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"📂 Work directory kept at {workdir}")
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.json_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%} of {args.baseline}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark the Manim code sanitizer over a corpus of GPT responses.
+
+Usage:
+    python benchmarks/bench_sanitize.py                 # bundled corpus
+    python benchmarks/bench_sanitize.py --llm-cache     # + responses cached by the server
+    python benchmarks/bench_sanitize.py responses/*.txt --repeat 500
+
+Every response is split into explanation + code the same way the pipeline
+does it, then sanitized `--repeat` times. Rejected responses are the ones that
+would previously have reached a Manim subprocess before failing.
+"""
+
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cache_utils import CACHE_ROOT  # noqa: E402
+from sanitize_utils import sanitize_manim_code, InvalidManimCode  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+CODE_BLOCK = re.compile(r"```(?:python)?\n([\s\S]*?)```")  # same as extract_explanation_and_code
+
+
+def load_corpus(paths, include_llm_cache):
+    files = list(paths) or sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt")))
+    if include_llm_cache:
+        files += sorted(glob.glob(os.path.join(ROOT, CACHE_ROOT, "llm", "*.txt")))
+
+    corpus = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            match = CODE_BLOCK.search(f.read())
+        if match:
+            corpus.append((os.path.basename(path), match.group(1).strip()))
+        else:
+            print(f"⚠️ No code block in {path}, skipping")
+    return corpus
+
+
+def bench(name, code, repeat):
+    timings = []
+    error = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            sanitize_manim_code(code)
+        except InvalidManimCode as e:
+            error = str(e)
+        timings.append(time.perf_counter() - start)
+    return timings, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="response files (default: benchmarks/corpus/*.txt)")
+    parser.add_argument("--repeat", type=int, default=200, help="sanitize runs per response")
+    parser.add_argument("--llm-cache", action="store_true", help="also include cached GPT responses")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.paths, args.llm_cache)
+    if not corpus:
+        sys.exit("No responses to benchmark")
+
+    all_timings = []
+    rejected = 0
+    print(f"{'response':<32} {'bytes':>7} {'median ms':>10} {'p95 ms':>8}  result")
+    for name, code in corpus:
+        timings, error = bench(name, code, args.repeat)
+        all_timings.extend(timings)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        result = f"rejected ({error})" if error else "ok"
+        rejected += bool(error)
+        print(f"{name[:32]:<32} {len(code.encode('utf-8')):>7} "
+              f"{statistics.median(timings) * 1000:>10.3f} {p95 * 1000:>8.3f}  {result}")
+
+    all_timings.sort()
+    print()
+    print(f"📊 {len(corpus)} responses, {rejected} rejected before rendering")
+    print(f"⏱️ median {statistics.median(all_timings) * 1000:.3f} ms, "
+          f"p95 {all_timings[int(len(all_timings) * 0.95) - 1] * 1000:.3f} ms, "
+          f"max {all_timings[-1] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+OpenAI-compatible stand-in LLM server that replays recorded responses.
+
+Usage:
+    python benchmarks/llm_server.py --port 8089 --tokens-per-second 60
+    VOICEMATION_LLM_BACKEND=openai VOICEMATION_LLM_ENDPOINT=http://127.0.0.1:8089/v1 python app.py
+
+Answers POST /v1/chat/completions from benchmarks/fixtures.json (see
+bench_pipeline.ReplayBackend), streamed or whole, so the real HTTP client,
+connection pool, deadlines and retries can be exercised in capacity runs
+without GPT.
+--error-rate makes a share of requests fail with 429/503 to test retries.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import FIXTURES_PATH, ReplayBackend, load_fixtures  # noqa: E402
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+    backend = None
+    error_rate = 0.0
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+            user = next(m["content"] for m in reversed(request["messages"]) if m["role"] == "user")
+        except (ValueError, KeyError, StopIteration) as e:
+            return self._send_json(400, {"error": {"message": f"Bad request ({e})"}})
+
+        if random.random() < self.error_rate:
+            status = random.choice((429, 503))
+            return self._send_json(status, {"error": {"message": "Injected failure"}}, {"Retry-After": "1"})
+
+        response = self.backend.find(user)
+        if response is None:
+            return self._send_json(404, {"error": {"message": f"No recorded response for {user[:60]!r}"}})
+        if request.get("stream"):
+            return self._send_stream(response, request.get("model", "replay"))
+        time.sleep(self.backend.generation_seconds(response))
+        self._send_json(200, {
+            "id": f"replay-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "replay"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": response}, "finish_reason": "stop"}],
+            "usage": {"completion_tokens": len(response) // 4},
+        })
+
+    def _send_stream(self, response, model):
+        """Server-sent events in OpenAI's chat.completion.chunk format (chunked transfer)"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunk_id = f"replay-{time.time_ns()}"
+
+        def send(data):
+            payload = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        for piece in self.backend.pieces(response):
+            send(json.dumps({
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }))
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would drown out the pipeline's own logging
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--fixtures", default=FIXTURES_PATH, help="fixture manifest (default: benchmarks/fixtures.json)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="simulated generation speed (default: instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429/503")
+    args = parser.parse_args()
+
+    ReplayHandler.backend = ReplayBackend(load_fixtures(args.fixtures), args.tokens_per_second)
+    ReplayHandler.error_rate = args.error_rate
+    server = ThreadingHTTPServer((args.host, args.port), ReplayHandler)
+    print(f"🤖 Replaying {len(ReplayHandler.backend.responses)} responses on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
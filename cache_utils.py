@@ -0,0 +1,140 @@
+# cache_utils.py
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+
+CACHE_ROOT = os.environ.get("VOICEMATION_CACHE_DIR", os.path.join("media", "cache"))
+
+
+def hash_key(*parts):
+    """Stable SHA-256 hex digest of the given parts (str or bytes)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")  # separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+def link_or_copy(src_path, dst_path):
+    """Hard-link src to dst when possible (same filesystem), otherwise copy it."""
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    tmp_path = f"{dst_path}.{threading.get_ident()}.tmp"
+    try:
+        os.link(src_path, tmp_path)
+    except OSError:
+        shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+    return dst_path
+
+
+class DiskCache:
+    """
+    Content-addressed file cache with a size cap, LRU eviction and optional TTL.
+
+    Entries are plain files named <key><suffix> under `directory`. A hit bumps
+    the file's mtime, so eviction can drop the least recently used entries
+    first once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, name, max_bytes, suffix="", ttl_seconds=None):
+        self.name = name
+        self.directory = os.path.join(CACHE_ROOT, name)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def get_path(self, key):
+        """Return the cached file path for key, or None on a miss."""
+        path = self.path_for(key)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return self._miss()
+
+        if self.ttl_seconds is not None and time.time() - mtime > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return self._miss()
+
+        try:
+            os.utime(path)  # LRU bookkeeping
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get_bytes(self, key):
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_file(self, key, src_path):
+        """Store a copy of src_path under key and return the cached path."""
+        path = link_or_copy(src_path, self.path_for(key))
+        self._evict()
+        return path
+
+    def put_bytes(self, key, data):
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+        return path
+
+    def stats(self):
+        with self._lock:
+            return {"name": self.name, "hits": self.hits, "misses": self.misses}
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            # Oldest access first
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            print(f"🧹 Evicted {self.name} cache entries down to {total} bytes")
@@ -0,0 +1,132 @@
+# hls_utils.py
+
+import math
+import os
+import subprocess
+from voiceover_utils import subtitle_filter
+
+
+HLS_SEGMENT_SECONDS = int(os.environ.get("VOICEMATION_HLS_SEGMENT_SECONDS", "4"))
+
+
+def get_media_duration(path):
+    """Duration of an audio/video file in seconds (via ffprobe)"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path],
+        check=True, capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+class LivePlaylist:
+    """
+    HLS EVENT playlist that grows one scene at a time.
+
+    Each appended scene is packaged into .ts segments together with the span
+    of narration (and subtitles) that lines up with it, so a player can start
+    on scene 1 while later scenes are still rendering.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, "playlist.m3u8")
+        self.offset = 0.0      # seconds of video already in the playlist
+        self.scene_count = 0
+        self._entries = []     # (duration, segment file name, starts a new scene)
+        os.makedirs(directory, exist_ok=True)
+
+    def append_scene(self, scene_video, narration_path, srt_path=None):
+        """
+        Package one rendered scene and publish its segments. Returns the scene duration.
+        Without srt_path the video is stream-copied, so scenes should already carry
+        keyframes every HLS_SEGMENT_SECONDS (see fit_scene).
+        """
+        duration = get_media_duration(scene_video)
+        index = self.scene_count
+        scene_playlist = os.path.join(self.directory, f"scene_{index:02d}.m3u8")
+        segment_pattern = os.path.join(self.directory, f"scene_{index:02d}_%03d.ts")
+
+        command = [
+            "ffmpeg", "-y",
+            "-i", scene_video,
+            "-ss", f"{self.offset:.3f}", "-i", narration_path,  # this scene's narration span
+        ]
+        if srt_path and os.path.exists(srt_path):
+            # Shift into narration time so subtitle cues line up, then back to zero
+            command.extend([
+                "-vf", f"setpts=PTS+{self.offset:.3f}/TB,{subtitle_filter(srt_path)},setpts=PTS-STARTPTS",
+            ])
+        command.extend([
+            "-map", "0:v:0",
+            "-map", "1:a:0?",
+            "-af", "apad",             # silence if the narration ends before the video
+            "-t", f"{duration:.3f}",
+        ])
+        if srt_path and os.path.exists(srt_path):
+            command.extend(["-c:v", "libx264", "-tune", "animation"])
+        else:
+            command.extend(["-c:v", "copy"])  # already timed and subtitled
+        command.extend([
+            "-c:a", "aac",
+            "-output_ts_offset", f"{self.offset:.3f}",
+            "-f", "hls",
+            "-hls_time", str(HLS_SEGMENT_SECONDS),
+            "-hls_playlist_type", "vod",
+            "-hls_segment_filename", segment_pattern,
+            scene_playlist,
+        ])
+        subprocess.run(command, check=True, capture_output=True, text=True)
+
+        first = True
+        for segment_duration, segment_name in _read_segments(scene_playlist):
+            self._entries.append((segment_duration, segment_name, first and index > 0))
+            first = False
+
+        self.scene_count += 1
+        self.offset += duration
+        self._write()
+        print(f"📡 Scene {index + 1} published to live playlist ({self.offset:.1f}s available)")
+        return duration
+
+    def finish(self):
+        """Mark the playlist complete so players stop polling it."""
+        self._write(ended=True)
+
+    def _write(self, ended=False):
+        target = max((math.ceil(d) for d, _, _ in self._entries), default=HLS_SEGMENT_SECONDS)
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{target}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for segment_duration, segment_name, discontinuity in self._entries:
+            if discontinuity:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines.append(f"#EXTINF:{segment_duration:.3f},")
+            lines.append(segment_name)
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+
+        # Atomic replace so a polling player never sees a half-written playlist
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+def _read_segments(playlist_path):
+    """(duration, segment name) pairs from an ffmpeg-written media playlist"""
+    segments = []
+    duration = None
+    with open(playlist_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line and not line.startswith("#") and duration is not None:
+                segments.append((duration, os.path.basename(line)))
+                duration = None
+    return segments
@@ -0,0 +1,228 @@
+# hold_utils.py
+
+import ast
+import json
+import os
+import shutil
+import subprocess
+
+
+# Static waits at least this long render a single frame; ffmpeg restores the
+# rest. Set VOICEMATION_ELIDE_WAITS=0 to render every frame in Manim.
+ELIDE_WAITS = os.environ.get("VOICEMATION_ELIDE_WAITS", "1") == "1"
+ELIDE_MIN_SECONDS = float(os.environ.get("VOICEMATION_ELIDE_MIN_WAIT", "2"))
+
+HOLD_FUNCTION = "_voicemation_hold"
+
+# Appended to the scene module (so tracebacks keep their line numbers).
+# Waits with active updaters aren't static and are rendered normally.
+# renderer.time advances one 1/fps step per written frame, so it gives the
+# exact frame the hold starts at.
+HOLD_HELPER = '''
+
+def _voicemation_hold(scene, duration=1.0):
+    import json, os
+    from manim import config
+    frame = 1.0 / config.frame_rate
+    if (duration < {min_seconds} or config.dry_run or not hasattr(scene, "renderer")
+            or scene.should_update_mobjects()):
+        return scene.wait(duration)
+    scene.wait(frame)
+    holds = _voicemation_holds.setdefault(type(scene).__name__, [])
+    holds.append([round(scene.renderer.time * config.frame_rate), duration - frame])
+    path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        f"{{type(scene).__name__}}.{{config.pixel_height}}p{{config.frame_rate:g}}.holds.json",
+    )
+    with open(path, "w") as f:
+        json.dump(holds, f)
+
+
+_voicemation_holds = {{}}
+'''
+
+
+def _is_self_wait(node):
+    """self.wait(x) / self.wait(duration=x) with nothing else that changes its meaning"""
+    func = node.func
+    if not (isinstance(func, ast.Attribute) and func.attr == "wait"
+            and isinstance(func.value, ast.Name) and func.value.id == "self"):
+        return False
+    if len(node.args) == 1 and not node.keywords:
+        return True
+    return not node.args and [kw.arg for kw in node.keywords] == ["duration"]
+
+
+def elide_waits(source):
+    """
+    Rewrite self.wait(...) calls to the hold helper. Returns (source, count);
+    the source is unchanged when there is nothing to elide.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source, 0
+
+    calls = [node for node in ast.walk(tree) if isinstance(node, ast.Call) and _is_self_wait(node)]
+    if not calls:
+        return source, 0
+
+    # Splice the text rather than unparse, so formatting and line numbers survive
+    lines = source.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    def offset(lineno, col):
+        # ast columns are UTF-8 byte offsets
+        line = lines[lineno - 1]
+        return offsets[lineno - 1] + len(line.encode("utf-8")[:col].decode("utf-8", "ignore"))
+
+    edits = []
+    for call in calls:
+        start = offset(call.func.lineno, call.func.col_offset)
+        end = offset(call.func.end_lineno, call.func.end_col_offset)
+        paren = source.index("(", end) + 1
+        edits.append((start, paren, f"{HOLD_FUNCTION}(self, "))
+    for start, end, text in sorted(edits, reverse=True):
+        source = source[:start] + text + source[end:]
+
+    return source + HOLD_HELPER.format(min_seconds=ELIDE_MIN_SECONDS), len(calls)
+
+
+def holds_path(source_path, scene_class, height, fps):
+    """Sidecar the hold helper writes for one scene render"""
+    return os.path.join(os.path.dirname(source_path), f"{scene_class}.{height}p{fps:g}.holds.json")
+
+
+def read_holds(path):
+    """[(frame index, extra seconds), ...] recorded during a render, or []"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [(int(frame), float(seconds)) for frame, seconds in json.load(f)]
+    except (OSError, ValueError, TypeError):
+        return []
+
+
+def _frame_count(video_path):
+    """Frames in the video stream (read from the MP4 header), or None"""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=nb_frames",
+             "-of", "default=noprint_wrappers=1:nokey=1", video_path],
+            check=True, capture_output=True, text=True
+        )
+        return int(result.stdout.strip())
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        return None
+
+
+def hold_sidecar(video_path):
+    """Holds recorded for a rendered scene video, kept next to it"""
+    return os.path.splitext(video_path)[0] + ".holds.json"
+
+
+def write_holds(path, holds):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([list(hold) for hold in holds], f)
+
+
+def fit_holds(holds, motion_seconds, target_seconds):
+    """
+    Rescale elided holds so a scene with motion_seconds of rendered video lasts
+    target_seconds. Returns (holds, tail_seconds): scenes without holds get a
+    tail hold on their last frame instead, and scenes whose motion alone is
+    longer than the target collapse their holds to the single rendered frame.
+    """
+    room = target_seconds - motion_seconds
+    extra = sum(seconds for _, seconds in holds)
+    if room <= 0:
+        return [(frame, 0.0) for frame, _ in holds], 0.0
+    if extra > 0:
+        scale = room / extra
+        return [(frame, seconds * scale) for frame, seconds in holds], 0.0
+    return list(holds), room
+
+
+def expand_holds(video_path, holds, output_path=None, tail_seconds=0.0, post_filter=None, keyframe_interval=None):
+    """
+    Stretch each recorded hold frame back to its wait: the video is cut after
+    every hold frame and tpad clones that frame for the elided duration before
+    the pieces are concatenated again. tail_seconds holds the last frame
+    longer, post_filter (e.g. subtitles) runs on the result in the same encode.
+    Writes output_path (default: in place) and returns it.
+    """
+    output_path = output_path or video_path
+    holds = sorted(hold for hold in holds if hold[1] > 0.0005)  # collapsed holds need no cut
+    if not holds and tail_seconds <= 0.0005 and not post_filter:
+        if output_path != video_path:
+            shutil.copyfile(video_path, output_path)
+        return output_path
+
+    # Scenes usually end on a hold - then there is no tail piece after it
+    total_frames = _frame_count(video_path)
+    segments = []  # (start frame, end frame or None, seconds to clone the last frame)
+    start = 0
+    for end, seconds in holds:
+        segments.append((start, end, seconds))
+        start = end
+    if not holds or total_frames is None or start < total_frames:
+        segments.append((start, None, 0.0))
+    first, last, seconds = segments[-1]
+    segments[-1] = (first, last, seconds + tail_seconds)
+
+    chains = [f"[0:v]split={len(segments)}" + "".join(f"[in{i}]" for i in range(len(segments)))]
+    for i, (first, last, seconds) in enumerate(segments):
+        trim = f"trim=start_frame={first}" + (f":end_frame={last}" if last is not None else "")
+        pad = f",tpad=stop_mode=clone:stop_duration={seconds:.3f}" if seconds > 0.0005 else ""
+        chains.append(f"[in{i}]{trim},setpts=PTS-STARTPTS{pad}[p{i}]")
+    chains.append(
+        "".join(f"[p{i}]" for i in range(len(segments)))
+        + f"concat=n={len(segments)}:v=1:a=0"
+        + (f",{post_filter}" if post_filter else "")
+        + "[v]"
+    )
+
+    tmp_path = output_path.replace(".mp4", ".expanding.mp4")
+    command = [
+        "ffmpeg", "-y", "-i", video_path,
+        "-filter_complex", ";".join(chains),
+        "-map", "[v]",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-tune", "animation",
+        "-pix_fmt", "yuv420p",
+    ]
+    if keyframe_interval:
+        # Keyframes on a fixed grid so HLS can cut segments without re-encoding
+        command.extend(["-force_key_frames", f"expr:gte(t,n_forced*{keyframe_interval})"])
+    command.extend(["-movflags", "+faststart", tmp_path])
+    subprocess.run(command, check=True, capture_output=True, text=True)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def hold_last_frame(video_path, seconds, output_path, post_filter=None, keyframe_interval=None):
+    """
+    Write a clip that shows the last frame of video_path for seconds, encoded
+    like expand_holds output so it can be concatenated after the video.
+    post_filter runs on the clip as in expand_holds. Returns output_path.
+    """
+    # Only the last second is decoded; reversing it puts the last frame first
+    chain = f"[0:v]reverse,trim=end_frame=1,setpts=PTS-STARTPTS,tpad=stop_mode=clone:stop_duration={seconds:.3f}"
+    tmp_path = output_path.replace(".mp4", ".holding.mp4")
+    command = [
+        "ffmpeg", "-y", "-sseof", "-1", "-i", video_path,
+        "-filter_complex", chain + (f",{post_filter}" if post_filter else "") + "[v]",
+        "-map", "[v]",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-tune", "animation",
+        "-pix_fmt", "yuv420p",
+    ]
+    if keyframe_interval:
+        command.extend(["-force_key_frames", f"expr:gte(t,n_forced*{keyframe_interval})"])
+    command.extend(["-movflags", "+faststart", tmp_path])
+    subprocess.run(command, check=True, capture_output=True, text=True)
+    os.replace(tmp_path, output_path)
+    return output_path
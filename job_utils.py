@@ -0,0 +1,172 @@
+# job_utils.py
+
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Pool sizing - renders are subprocess bound, so threads are enough here
+JOB_WORKERS = int(os.environ.get("VOICEMATION_JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.environ.get("VOICEMATION_JOB_MAX_PENDING", "32"))
+JOB_TTL_SECONDS = int(os.environ.get("VOICEMATION_JOB_TTL", str(6 * 3600)))
+JOB_STATE_DIR = os.environ.get("VOICEMATION_JOB_DIR", os.path.join("media", "jobs"))
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the job backlog is already at JOB_MAX_PENDING."""
+
+
+class JobQueue:
+    """
+    Bounded pool that runs pipeline jobs in the background.
+
+    Job state lives in memory and is mirrored to a small JSON file per job
+    so that any web worker process can answer status polls, not only the one
+    that accepted the upload.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, state_dir=JOB_STATE_DIR):
+        self.max_pending = max_pending
+        self.state_dir = state_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="voicemation-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn(job_id, *args, **kwargs) and return the new job ID right away.
+        fn gets the ID so it can report progress through update(); its return
+        value is stored as the job's `result`.
+        """
+        with self._lock:
+            self._purge_expired()
+            active = sum(1 for job in self._jobs.values() if job["status"] in (QUEUED, RUNNING))
+            if active >= self.max_pending:
+                raise QueueFullError(f"{active} jobs already pending")
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": QUEUED,
+                "created_at": time.time(),
+                "updated_at": time.time(),
+                "result": None,
+                "error": None,
+            }
+        self._persist(job_id)
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        print(f"📥 Queued job {job_id}")
+        return job_id
+
+    def update(self, job_id, **fields):
+        """Merge fields into a job's state (used for progress reporting)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["updated_at"] = time.time()
+            self._changed.notify_all()
+        self._persist(job_id)
+
+    def get(self, job_id):
+        """Return a snapshot of the job state, or None if the job is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return self._load(job_id)
+
+    def wait_for_update(self, job_id, since, timeout):
+        """
+        Block until the job's updated_at moves past `since` (or timeout) and
+        return the latest snapshot. Jobs owned by another server process are
+        followed through their state file instead.
+        """
+        deadline = time.time() + timeout
+        with self._lock:
+            if job_id in self._jobs:
+                self._changed.wait_for(
+                    lambda: job_id not in self._jobs or self._jobs[job_id]["updated_at"] > since,
+                    timeout=timeout,
+                )
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    return dict(job)
+
+        while True:
+            job = self._load(job_id)
+            if job is None or job["updated_at"] > since or time.time() >= deadline:
+                return job
+            time.sleep(min(1.0, max(0.0, deadline - time.time())))
+
+    def _run(self, job_id, fn, args, kwargs):
+        self.update(job_id, status=RUNNING, started_at=time.time())
+        print(f"⚙️ Running job {job_id}")
+        try:
+            result = fn(job_id, *args, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.update(job_id, status=FAILED, error=f"Pipeline error: {str(e)}")
+            print(f"❌ Job {job_id} failed: {e}")
+            return
+        if result:
+            self.update(job_id, status=DONE, result=result)
+            print(f"✅ Job {job_id} finished")
+        else:
+            self.update(job_id, status=FAILED, error="Failed to generate video")
+            print(f"❌ Job {job_id} produced no video")
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _persist(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            snapshot = dict(job)
+        path = self._state_path(job_id)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not persist job {job_id}: {e}")
+
+    def _load(self, job_id):
+        # Job IDs are uuid4 hex - refuse anything else so the ID can't escape state_dir
+        if not job_id or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        try:
+            with open(self._state_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _purge_expired(self):
+        # Caller holds self._lock
+        cutoff = time.time() - JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in (DONE, FAILED) and job["updated_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            try:
+                os.remove(self._state_path(job_id))
+            except OSError:
+                pass
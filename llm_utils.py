@@ -0,0 +1,358 @@
+# llm_utils.py
+
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from metrics_utils import inc, observe
+
+
+# "github" (GitHub Models through the Azure AI Inference SDK, default) or
+# "openai" (any OpenAI-compatible /chat/completions server, e.g. a local stand-in)
+LLM_BACKEND = os.environ.get("VOICEMATION_LLM_BACKEND", "github")
+LLM_ENDPOINT = os.environ.get("VOICEMATION_LLM_ENDPOINT")  # default depends on the backend
+LLM_MODEL = os.environ.get("VOICEMATION_LLM_MODEL", "gpt-4o")
+# Deadline for a whole call in seconds, retries and backoff included
+LLM_TIMEOUT = float(os.environ.get("VOICEMATION_LLM_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = float(os.environ.get("VOICEMATION_LLM_CONNECT_TIMEOUT", "10"))
+# Retries on 429/5xx/connection errors, backing off exponentially from LLM_BACKOFF_SECONDS
+LLM_RETRIES = int(os.environ.get("VOICEMATION_LLM_RETRIES", "3"))
+LLM_BACKOFF_SECONDS = float(os.environ.get("VOICEMATION_LLM_BACKOFF", "1.0"))
+# Keep-alive connections shared by every LLM request in the process
+LLM_POOL_SIZE = int(os.environ.get("VOICEMATION_LLM_POOL_SIZE", "16"))
+# Stream completions so downstream stages can start before the reply is finished
+LLM_STREAM = os.environ.get("VOICEMATION_LLM_STREAM", "1") == "1"
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    """
+    A completion request failed. status is the HTTP status (None for
+    connection errors and timeouts); retry_after is the server's hint in seconds.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.status is None or self.status in RETRYABLE_STATUS
+
+
+def _retry_after(headers):
+    """Seconds from a Retry-After header (delta or HTTP date), or None"""
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session():
+    """Process-wide requests session; its pooled connections (and TLS sessions) stay open between calls."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=LLM_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+class LLMBackend:
+    """
+    Chat completion backend. complete() sends one system + user message pair
+    and returns the reply text; stream() yields it in pieces as it is
+    generated (backends without streaming yield it whole). Both must give up
+    after `timeout` seconds without data and raise LLMError on failure;
+    retries are handled by chat_completion() / stream_chat_completion().
+    """
+
+    name = "base"
+    default_endpoint = None
+
+    def __init__(self, endpoint=None, model=LLM_MODEL):
+        self.endpoint = endpoint or LLM_ENDPOINT or self.default_endpoint
+        self.model = model
+
+    def complete(self, system, user, max_tokens, temperature, top_p, timeout):
+        raise NotImplementedError
+
+    def stream(self, system, user, max_tokens, temperature, top_p, timeout):
+        yield self.complete(system, user, max_tokens, temperature, top_p, timeout)
+
+
+class GitHubBackend(LLMBackend):
+    """GitHub Models via azure.ai.inference, sharing the pooled HTTP session."""
+
+    name = "github"
+    default_endpoint = "https://models.github.ai/inference"
+
+    def __init__(self, endpoint=None, model=LLM_MODEL):
+        super().__init__(endpoint, model)
+        from azure.ai.inference import ChatCompletionsClient
+        from azure.core.credentials import AzureKeyCredential
+        from azure.core.pipeline.transport import RequestsTransport
+
+        # One client for the whole process (Azure SDK clients are thread-safe)
+        self.client = ChatCompletionsClient(
+            endpoint=self.endpoint,
+            credential=AzureKeyCredential(os.environ["GITHUB_TOKEN"]),
+            transport=RequestsTransport(session=http_session(), session_owner=False),
+            retry_total=0,  # retries are ours, bounded by the call deadline
+        )
+
+    def _request(self, system, user, max_tokens, temperature, top_p, timeout, stream=False):
+        from azure.ai.inference.models import SystemMessage, UserMessage
+
+        return self.client.complete(
+            messages=[SystemMessage(system), UserMessage(user)],
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            model=self.model,
+            stream=stream,
+            connection_timeout=min(LLM_CONNECT_TIMEOUT, timeout),
+            read_timeout=timeout,
+        )
+
+    @staticmethod
+    def _error(e):
+        """LLMError for an azure-core exception, or None if it isn't a transport/HTTP one"""
+        from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+        if isinstance(e, HttpResponseError):
+            headers = e.response.headers if e.response is not None else None
+            return LLMError(f"HTTP {e.status_code}: {e.message}", e.status_code, _retry_after(headers))
+        if isinstance(e, (ServiceRequestError, ServiceResponseError)):
+            return LLMError(f"{type(e).__name__}: {e}")
+        return None
+
+    def complete(self, system, user, max_tokens, temperature, top_p, timeout):
+        try:
+            response = self._request(system, user, max_tokens, temperature, top_p, timeout)
+        except Exception as e:
+            error = self._error(e)
+            if error is None:
+                raise
+            raise error from e
+        return response.choices[0].message.content or ""
+
+    def stream(self, system, user, max_tokens, temperature, top_p, timeout):
+        try:
+            updates = self._request(system, user, max_tokens, temperature, top_p, timeout, stream=True)
+            with updates:
+                for update in updates:
+                    if update.choices and update.choices[0].delta and update.choices[0].delta.content:
+                        yield update.choices[0].delta.content
+        except Exception as e:
+            error = self._error(e)
+            if error is None:
+                raise
+            raise error from e
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    Any OpenAI-compatible /chat/completions server (vLLM, llama.cpp, the
+    benchmark stand-in, ...). VOICEMATION_LLM_API_KEY is sent as a bearer token.
+    """
+
+    name = "openai"
+    default_endpoint = "http://127.0.0.1:8089/v1"
+
+    def __init__(self, endpoint=None, model=LLM_MODEL, api_key=None):
+        super().__init__(endpoint, model)
+        self.url = self.endpoint.rstrip("/") + "/chat/completions"
+        self.headers = {"Content-Type": "application/json"}
+        api_key = api_key or os.environ.get("VOICEMATION_LLM_API_KEY")
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _post(self, system, user, max_tokens, temperature, top_p, timeout, stream=False):
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+        try:
+            response = http_session().post(
+                self.url, json=payload, headers=self.headers, stream=stream,
+                timeout=(min(LLM_CONNECT_TIMEOUT, timeout), timeout),
+            )
+        except requests.RequestException as e:
+            raise LLMError(f"{type(e).__name__}: {e}") from e
+        if response.status_code != 200:
+            error = LLMError(f"HTTP {response.status_code}: {response.text[:200]}",
+                             response.status_code, _retry_after(response.headers))
+            response.close()
+            raise error
+        return response
+
+    def complete(self, system, user, max_tokens, temperature, top_p, timeout):
+        response = self._post(system, user, max_tokens, temperature, top_p, timeout)
+        try:
+            return response.json()["choices"][0]["message"]["content"] or ""
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Malformed completion response ({type(e).__name__}: {e})", response.status_code) from e
+
+    def stream(self, system, user, max_tokens, temperature, top_p, timeout):
+        """Server-sent events: `data: {chunk}` lines, ending with `data: [DONE]`"""
+        response = self._post(system, user, max_tokens, temperature, top_p, timeout, stream=True)
+        with response:
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    try:
+                        delta = json.loads(data)["choices"][0].get("delta") or {}
+                    except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                        raise LLMError(f"Malformed stream chunk ({type(e).__name__}: {e})", response.status_code) from e
+                    if delta.get("content"):
+                        yield delta["content"]
+            except requests.RequestException as e:
+                raise LLMError(f"{type(e).__name__}: {e}") from e
+
+
+BACKENDS = {
+    "github": GitHubBackend,
+    "openai": OpenAIBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured LLMBackend (created once per process)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend_class = BACKENDS.get(LLM_BACKEND)
+            if backend_class is None:
+                raise ValueError(f"Unknown VOICEMATION_LLM_BACKEND {LLM_BACKEND!r} (expected one of {sorted(BACKENDS)})")
+            _backend = backend_class()
+        return _backend
+
+
+def set_backend(backend):
+    """Swap in another LLMBackend instance (replay stand-ins, capacity runs)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _backoff(attempt):
+    """Exponential backoff with jitter: ~1x, 2x, 4x ... LLM_BACKOFF_SECONDS"""
+    return LLM_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+
+
+def _observe_request(backend, purpose, status, start):
+    observe("voicemation_llm_request_seconds", time.perf_counter() - start,
+            help_text="Latency of individual LLM requests (each retry counted)",
+            backend=backend.name, purpose=purpose, status=status)
+
+
+def _wait_to_retry(e, attempt, deadline, backend, purpose):
+    """Sleep before retry number `attempt`, or re-raise e when it shouldn't be retried"""
+    delay = e.retry_after if e.retry_after is not None else _backoff(attempt)
+    if not e.retryable or attempt > LLM_RETRIES or time.monotonic() + delay >= deadline:
+        raise e
+    status = str(e.status or "error")
+    inc("voicemation_llm_retries_total", help_text="LLM requests retried after a failure",
+        backend=backend.name, purpose=purpose, status=status)
+    print(f"🔁 LLM request failed ({e}), retrying in {delay:.1f}s ({attempt}/{LLM_RETRIES})")
+    time.sleep(delay)
+
+
+def chat_completion(system, user, max_tokens=2000, temperature=0.7, top_p=1.0, timeout=LLM_TIMEOUT, purpose="generate"):
+    """
+    One chat completion through the configured backend. Retryable failures
+    (429, 5xx, connection errors) are retried up to LLM_RETRIES times with
+    exponential backoff, as long as the retry fits in `timeout` seconds
+    overall. Raises LLMError.
+    """
+    backend = get_backend()
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError(f"LLM deadline of {timeout:.0f}s exceeded")
+
+        start = time.perf_counter()
+        try:
+            text = backend.complete(system, user, max_tokens, temperature, top_p, remaining)
+        except LLMError as e:
+            _observe_request(backend, purpose, str(e.status or "error"), start)
+            attempt += 1
+            _wait_to_retry(e, attempt, deadline, backend, purpose)
+            continue
+
+        _observe_request(backend, purpose, "200", start)
+        return text
+
+
+def stream_chat_completion(system, user, max_tokens=2000, temperature=0.7, top_p=1.0, timeout=LLM_TIMEOUT, purpose="generate"):
+    """
+    Like chat_completion(), but yields the reply in pieces as they are
+    generated. Failures are retried only until the first piece has been
+    yielded; after that they are raised, since the caller already used it.
+    The whole stream must finish within `timeout` seconds.
+    """
+    backend = get_backend()
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError(f"LLM deadline of {timeout:.0f}s exceeded")
+
+        start = time.perf_counter()
+        started = False
+        try:
+            for piece in backend.stream(system, user, max_tokens, temperature, top_p, remaining):
+                if not started:
+                    started = True
+                    observe("voicemation_llm_first_token_seconds", time.perf_counter() - start,
+                            help_text="Time until a streamed LLM reply starts arriving",
+                            backend=backend.name, purpose=purpose)
+                yield piece
+                if time.monotonic() > deadline:
+                    raise LLMError(f"LLM deadline of {timeout:.0f}s exceeded mid-stream")
+        except LLMError as e:
+            _observe_request(backend, purpose, str(e.status or "error"), start)
+            if started:
+                raise
+            attempt += 1
+            _wait_to_retry(e, attempt, deadline, backend, purpose)
+            continue
+
+        _observe_request(backend, purpose, "200", start)
+        return
@@ -0,0 +1,245 @@
+# manim_worker.py
+
+import importlib.util
+import multiprocessing
+import os
+import queue
+import resource
+import subprocess
+import threading
+import time
+import traceback
+import uuid
+
+
+# Recycle a worker after this many renders, or once its RSS grows past the cap
+WORKER_MAX_JOBS = int(os.environ.get("VOICEMATION_MANIM_WORKER_MAX_JOBS", "20"))
+WORKER_MAX_RSS_MB = int(os.environ.get("VOICEMATION_MANIM_WORKER_MAX_RSS_MB", "1536"))
+WORKER_START_TIMEOUT = 120  # seconds to import manim in a fresh worker
+# After a worker fails to start, use subprocesses for this long before trying
+# again; the cooldown doubles with every further failure, up to the cap
+WORKER_RETRY_SECONDS = float(os.environ.get("VOICEMATION_MANIM_WORKER_RETRY", "30"))
+WORKER_RETRY_MAX_SECONDS = 600
+
+# CLI quality flag -> manim config quality name
+QUALITY_NAMES = {
+    "-ql": "low_quality",
+    "-qm": "medium_quality",
+    "-qh": "high_quality",
+    "-qp": "production_quality",
+    "-qk": "fourk_quality",
+}
+
+
+class WorkerUnavailable(Exception):
+    """Raised when warm workers can't be started (e.g. manim isn't importable)."""
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak, in KB on Linux - good enough as a growth signal
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _render_in_worker(source_path, scene_class, media_dir, quality, resolution=None, frame_rate=None, dry_run=False):
+    from manim import tempconfig
+
+    # Load the generated module under a unique name so repeated renders never
+    # pick up a stale class from a previous job
+    module_name = f"voicemation_scene_{uuid.uuid4().hex}"
+    spec = importlib.util.spec_from_file_location(module_name, source_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    overrides = {
+        "media_dir": media_dir,
+        "input_file": source_path,
+        "quality": quality,
+        "progress_bar": "none",
+        "dry_run": dry_run,  # run construct() without writing any frames
+    }
+    # Applied after "quality", which would otherwise reset them
+    if resolution:
+        overrides["pixel_width"], overrides["pixel_height"] = resolution
+    if frame_rate:
+        overrides["frame_rate"] = frame_rate
+    with tempconfig(overrides):
+        scene = getattr(module, scene_class)()
+        scene.render()
+        if dry_run:
+            return None
+        return str(scene.renderer.file_writer.movie_file_path)
+
+
+def _worker_main(conn, max_jobs, max_rss_mb):
+    """Worker process loop: import manim once, then render scenes on request."""
+    try:
+        import manim  # noqa: F401 - the expensive import we want to pay only once
+    except Exception as e:
+        conn.send(("fatal", f"{type(e).__name__}: {e}", True))
+        return
+    conn.send(("ready", os.getpid(), False))
+
+    jobs_done = 0
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+
+        try:
+            result = ("ok", _render_in_worker(*request))
+        except BaseException:
+            result = ("error", traceback.format_exc())
+
+        jobs_done += 1
+        retire = jobs_done >= max_jobs or _current_rss_mb() > max_rss_mb
+        conn.send(result + (retire,))
+        if retire:
+            return
+
+
+class _Worker:
+    def __init__(self, ctx, max_jobs, max_rss_mb):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, max_jobs, max_rss_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+        if not self.conn.poll(WORKER_START_TIMEOUT):
+            self.kill()
+            raise WorkerUnavailable("Manim worker did not start in time")
+        try:
+            status, detail, _ = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.kill()
+            raise WorkerUnavailable(f"Manim worker exited while starting ({e!r})")
+        if status != "ready":
+            self.kill()
+            raise WorkerUnavailable(detail)
+        print(f"🔥 Warm Manim worker started (pid {detail})")
+
+    def kill(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+
+
+class ManimWorkerPool:
+    """
+    Pool of long-lived processes that keep manim imported and render scenes
+    through its Python API, so each render skips interpreter startup,
+    `from manim import *` and Cairo/Pango/font setup.
+
+    Errors are surfaced as subprocess.CalledProcessError / TimeoutExpired so
+    callers can treat a warm render exactly like a `manim` subprocess.
+    """
+
+    def __init__(self, size, max_jobs=WORKER_MAX_JOBS, max_rss_mb=WORKER_MAX_RSS_MB):
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self._disabled_until = 0.0
+        self._start_failures = 0
+        self._state_lock = threading.Lock()
+        # spawn, not fork: the web server process is multi-threaded
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    @property
+    def enabled(self):
+        """False while cooling down after a worker failed to start"""
+        return time.monotonic() >= self._disabled_until
+
+    def render(self, source_path, scene_class, media_dir, quality_flag="-ql", timeout=300,
+               resolution=None, frame_rate=None, dry_run=False):
+        """
+        Render scene_class from source_path and return the movie file path.
+        resolution (width, height) and frame_rate override the quality preset.
+        With dry_run, construct() runs without writing any output and None is returned.
+        """
+        if not self.enabled:
+            raise WorkerUnavailable("warm Manim workers are disabled")
+
+        quality = QUALITY_NAMES.get(quality_flag, "low_quality")
+        command = ["<manim-worker>", quality_flag] + (["--dry_run"] if dry_run else []) + [source_path, scene_class]
+
+        with self._slots:
+            worker = self._acquire()
+            try:
+                worker.conn.send((source_path, scene_class, media_dir, quality, resolution, frame_rate, dry_run))
+                if not worker.conn.poll(timeout):
+                    worker.kill()
+                    worker = None
+                    raise subprocess.TimeoutExpired(command, timeout)
+                status, detail, retire = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                # Worker died mid-render (segfault, OOM kill, ...)
+                if worker is not None:
+                    worker.kill()
+                worker = None
+                raise subprocess.CalledProcessError(1, command, output="", stderr=f"Manim worker died: {e}")
+
+            if retire:
+                print(f"♻️ Recycling Manim worker (pid {worker.process.pid})")
+                worker.process.join(timeout=5)
+                worker = None
+            if worker is not None:
+                self._idle.put(worker)
+
+        if status != "ok":
+            raise subprocess.CalledProcessError(1, command, output="", stderr=detail)
+        return detail
+
+    def shutdown(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(timeout=5)
+
+    def _acquire(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.process.is_alive():
+                return worker
+            worker.kill()
+
+        try:
+            worker = _Worker(self._ctx, self.max_jobs, self.max_rss_mb)
+        except WorkerUnavailable as e:
+            with self._state_lock:
+                self._start_failures += 1
+                cooldown = min(WORKER_RETRY_SECONDS * 2 ** (self._start_failures - 1), WORKER_RETRY_MAX_SECONDS)
+                self._disabled_until = time.monotonic() + cooldown
+            print(f"⚠️ Warm Manim workers unavailable, falling back to subprocesses for {cooldown:.0f}s: {e}")
+            raise
+
+        with self._state_lock:
+            recovered, self._start_failures = self._start_failures, 0
+        if recovered:
+            print(f"🔥 Warm Manim workers re-enabled after {recovered} failed start(s)")
+        return worker
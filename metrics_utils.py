@@ -0,0 +1,170 @@
+# metrics_utils.py
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Stage durations run from milliseconds (sanitize) to many minutes (in-depth renders)
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Payload sizes from short GPT answers up to full-length videos
+BYTES_BUCKETS = tuple(256 * 4 ** i for i in range(12))  # 256 B .. ~1 GB
+
+_lock = threading.Lock()
+_histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+_counters = {}     # (name, labels) -> value
+_help = {}         # name -> (type, help, buckets)
+_caches = []       # DiskCache instances whose hit/miss counters are exported
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _declare(name, kind, help_text, buckets=None):
+    if name not in _help:
+        _help[name] = (kind, help_text, buckets)
+
+
+def observe(name, value, help_text="", buckets=SECONDS_BUCKETS, **labels):
+    """Record one observation in a histogram."""
+    _declare(name, "histogram", help_text, buckets)
+    key = (name, _labels_key(labels))
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * len(buckets) + [0.0, 0]
+        index = bisect.bisect_left(buckets, value)
+        if index < len(buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+def inc(name, amount=1, help_text="", **labels):
+    """Increment a counter."""
+    _declare(name, "counter", help_text)
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe_size(kind, size):
+    """Record a payload size in bytes (GPT response, Manim code, video file, ...)."""
+    observe(
+        "voicemation_payload_bytes", size,
+        help_text="Size of pipeline payloads in bytes",
+        buckets=BYTES_BUCKETS, kind=kind
+    )
+
+
+def cpu_seconds():
+    """
+    CPU time of the calling thread plus every subprocess reaped so far
+    (ffmpeg, Manim CLI renders). Children aren't per-thread, so deltas are
+    only exact while stages don't overlap.
+    """
+    times = os.times()
+    return time.thread_time() + times.children_user + times.children_system
+
+
+@contextmanager
+def timed(stage, **labels):
+    """Time a pipeline stage (wall and CPU) and count its outcome."""
+    start = time.perf_counter()
+    cpu_start = cpu_seconds()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(
+            "voicemation_stage_seconds", elapsed,
+            help_text="Wall time spent in each pipeline stage",
+            stage=stage, **labels
+        )
+        observe(
+            "voicemation_stage_cpu_seconds", max(0.0, cpu_seconds() - cpu_start),
+            help_text="CPU time spent in each pipeline stage (including subprocesses)",
+            stage=stage, **labels
+        )
+        inc(
+            "voicemation_stage_total",
+            help_text="Pipeline stage runs by outcome",
+            stage=stage, status=status, **labels
+        )
+        print(f"⏱️ {stage} took {elapsed:.2f}s ({status})")
+
+
+def snapshot():
+    """
+    Current totals as plain data: {"histograms": {(name, labels): (sum, count)},
+    "counters": {(name, labels): value}} with labels as sorted (key, value) tuples.
+    """
+    with _lock:
+        return {
+            "histograms": {key: (series[-2], series[-1]) for key, series in _histograms.items()},
+            "counters": dict(_counters),
+        }
+
+
+def track_cache(cache):
+    """Export a DiskCache's hit/miss counters on /metrics."""
+    _caches.append(cache)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def render_prometheus():
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        histograms = {key: list(series) for key, series in _histograms.items()}
+        counters = dict(_counters)
+
+    for name, (kind, help_text, buckets) in sorted(_help.items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for (series_name, labels), series in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, series):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {series[-2]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {series[-1]}")
+        else:
+            for (series_name, labels), value in sorted(counters.items()):
+                if series_name == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    if _caches:
+        for metric, field in (("voicemation_cache_hits_total", "hits"), ("voicemation_cache_misses_total", "misses")):
+            lines.append(f"# HELP {metric} On-disk cache {field}")
+            lines.append(f"# TYPE {metric} counter")
+            for cache in _caches:
+                stats = cache.stats()
+                lines.append(f"{metric}{_format_labels([('cache', stats['name'])])} {stats[field]}")
+
+    return "\n".join(lines) + "\n"
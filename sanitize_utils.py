@@ -0,0 +1,127 @@
+# sanitize_utils.py
+
+import ast
+
+
+# Characters GPT likes to emit that break Python - applied in a single
+# str.translate pass over the whole source
+CHARACTER_FIXES = str.maketrans({
+    "×": "*",
+    "÷": "/",
+    "−": "-",
+    "‒": "-",
+    "–": "-",
+    "—": "-",
+    "“": '"',
+    "”": '"',
+    "‘": "'",
+    "’": "'",
+    "©": "(c)",
+    "™": "(tm)",
+    "°": "deg",
+})
+
+
+class InvalidManimCode(ValueError):
+    """Raised when generated Manim code is not valid Python."""
+
+
+def fix_characters(code):
+    """Drop invalid UTF-8 and replace typographic characters in one pass."""
+    return code.encode("utf-8", "ignore").decode("utf-8").translate(CHARACTER_FIXES)
+
+
+def _call_name(node):
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return None
+
+
+def _is_index(node):
+    """True for literal integer indices like [0] or [-1]."""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        node = node.operand
+    return isinstance(node, ast.Constant) and isinstance(node.value, int)
+
+
+def _method_call(target, method, args):
+    return ast.Call(
+        func=ast.Attribute(value=target, attr=method, ctx=ast.Load()),
+        args=args,
+        keywords=[],
+    )
+
+
+class ManimFixer(ast.NodeTransformer):
+    """
+    Rewrites Manim v0.18 API mistakes GPT keeps making:
+
+    - get_text(..., font_size=N)  ->  get_text(...).scale(0.7)
+    - get_text(..., color=C)      ->  get_text(...).set_color(C)
+    - Indicate(equation[0], ...)  ->  Indicate(equation, ...)
+      (MathTex parts often don't exist at the index GPT guessed)
+    """
+
+    def __init__(self):
+        self.changed = False
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        name = _call_name(node)
+
+        if name == "get_text":
+            keywords = {kw.arg: kw for kw in node.keywords}
+            font_size = keywords.get("font_size")
+            color = keywords.get("color")
+            if font_size is None and color is None:
+                return node
+
+            node.keywords = [kw for kw in node.keywords if kw not in (font_size, color)]
+            self.changed = True
+            if color is not None:
+                node = _method_call(node, "set_color", [color.value])
+            if font_size is not None:
+                node = _method_call(node, "scale", [ast.Constant(0.7)])
+            return node
+
+        if name == "Indicate" and node.args:
+            target = node.args[0]
+            while (isinstance(target, ast.Subscript)
+                   and isinstance(target.value, (ast.Name, ast.Subscript))
+                   and _is_index(target.slice)):
+                target = target.value
+            if target is not node.args[0]:
+                node.args[0] = target
+                self.changed = True
+
+        return node
+
+
+def sanitize_manim_code(manim_code: str) -> str:
+    """
+    Cleans up common GPT mistakes for Manim v0.18 compatibility and checks
+    that the result compiles. Raises InvalidManimCode for broken code, so it
+    is rejected before any render is scheduled.
+    """
+    code = fix_characters(manim_code)
+
+    try:
+        tree = ast.parse(code, filename="<manim>")
+    except SyntaxError as e:
+        raise InvalidManimCode(f"line {e.lineno}: {e.msg}") from e
+
+    fixer = ManimFixer()
+    tree = ast.fix_missing_locations(fixer.visit(tree))
+
+    # Catches what the parser lets through ('return' outside a function, ...)
+    try:
+        compile(tree, "<manim>", "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        raise InvalidManimCode(f"line {getattr(e, 'lineno', '?')}: {getattr(e, 'msg', e)}") from e
+
+    # Only regenerate the source when something was rewritten, so comments
+    # and formatting survive untouched code
+    return ast.unparse(tree) if fixer.changed else code
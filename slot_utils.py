@@ -0,0 +1,474 @@
+# slot_utils.py
+
+import ast
+import json
+import math
+import re
+from types import SimpleNamespace
+
+
+# In-depth videos built from GPT's slot JSON: every scene is one of the
+# parametric templates below, so GPT only writes narration and slot content
+# (formulas, labels, graph functions, example values) - never Manim code.
+MAX_SLOT_SCENES = 6
+WORDS_PER_SECOND = 2.5  # gTTS speaking rate, for each scene's hold
+
+# Shared by every template scene. Slot formulas come from GPT, so a formula
+# LaTeX rejects falls back to plain text instead of failing the render.
+SCENE_PRELUDE = '''from manim import *
+import numpy as np
+
+
+def _tex(source, **kwargs):
+    try:
+        return MathTex(source, **kwargs)
+    except Exception:
+        return Text(source, font_size=kwargs.get("font_size", 48) * 0.6, color=kwargs.get("color", WHITE))
+
+
+def _fit(mobject, width=12.0, height=6.0):
+    if mobject.width > width:
+        mobject.scale_to_fit_width(width)
+    if mobject.height > height:
+        mobject.scale_to_fit_height(height)
+    return mobject
+
+
+def _card(text, color):
+    box = RoundedRectangle(corner_radius=0.2, width=5.6, height=1.2, color=color).set_fill(color, opacity=0.15)
+    label = _fit(Text(text, font_size=26), 5.2, 1.0).move_to(box)
+    return VGroup(box, label)
+'''
+
+TITLE_BODY = '''
+        heading = _fit(Text(title, font_size=60, color=BLUE))
+        header = VGroup(heading)
+        self.play(Write(heading), run_time=2)
+        if subtitle:
+            caption = _fit(Text(subtitle, font_size=32, color=GRAY_B))
+            caption.next_to(heading, DOWN, buff=0.4)
+            header.add(caption)
+            self.play(FadeIn(caption, shift=UP * 0.2))
+        self.wait(2)
+        if points:
+            self.play(header.animate.scale(0.7).to_edge(UP))
+            rows = VGroup(*[
+                VGroup(Dot(color=YELLOW), Text(point, font_size=30)).arrange(RIGHT, buff=0.3)
+                for point in points
+            ]).arrange(DOWN, aligned_edge=LEFT, buff=0.5)
+            _fit(rows, 12, 4.5).next_to(header, DOWN, buff=0.7)
+            for row in rows:
+                self.play(FadeIn(row, shift=RIGHT * 0.3))
+                self.wait(1.5)
+'''
+
+FORMULA_BODY = '''
+        equation = _fit(_tex(formula, font_size=72))
+        self.play(Write(equation), run_time=2)
+        self.wait(2)
+        box = SurroundingRectangle(equation, color=YELLOW, buff=0.25)
+        self.play(Create(box))
+        if terms:
+            self.play(VGroup(equation, box).animate.scale(0.8).to_edge(UP, buff=0.7))
+            rows = VGroup(*[
+                VGroup(_tex(symbol, font_size=44, color=YELLOW), Text(meaning, font_size=28)).arrange(RIGHT, buff=0.5)
+                for symbol, meaning in terms
+            ]).arrange(DOWN, aligned_edge=LEFT, buff=0.45)
+            _fit(rows, 12, 4).next_to(box, DOWN, buff=0.6)
+            for row in rows:
+                self.play(FadeIn(row, shift=UP * 0.2))
+                self.wait(1.5)
+        if note:
+            caption = _fit(Text(note, font_size=28, color=GRAY_B)).to_edge(DOWN)
+            self.play(FadeIn(caption))
+'''
+
+GRAPH_BODY = '''
+        axes = Axes(
+            x_range=[x_min, x_max, x_step], y_range=[y_min, y_max, y_step],
+            x_length=9, y_length=5, tips=False,
+        ).to_edge(DOWN, buff=0.7)
+        labels = axes.get_axis_labels(x_label=Text(x_label, font_size=26), y_label=Text(y_label, font_size=26))
+        self.play(Create(axes), FadeIn(labels), run_time=2)
+        if formula:
+            equation = _fit(_tex(formula, font_size=44, color=BLUE), 5, 1.2).to_corner(UL)
+            self.play(Write(equation))
+        # Plotted on the sample grid the function was checked on
+        graph = axes.plot(f, x_range=[x_min, x_max, sample_step], color=BLUE)
+        self.play(Create(graph), run_time=3)
+        self.wait(2)
+        if highlight:
+            hx, hy, label = highlight
+            base = axes.c2p(hx, min(max(0, y_min), y_max))
+            dot = Dot(axes.c2p(hx, hy), color=YELLOW)
+            guide = DashedLine(base, dot.get_center(), color=YELLOW)
+            tag = Text(label, font_size=24, color=YELLOW).next_to(dot, UR, buff=0.15)
+            self.play(Create(guide), FadeIn(dot, scale=0.5))
+            self.play(Write(tag))
+'''
+
+STEPS_BODY = '''
+        heading = _fit(Text(problem, font_size=34, color=BLUE)).to_edge(UP)
+        self.play(Write(heading), run_time=2)
+        anchor = heading
+        if given:
+            values = _fit(VGroup(*[_tex(value, font_size=38) for value in given]).arrange(RIGHT, buff=0.8))
+            values.next_to(heading, DOWN, buff=0.5)
+            self.play(FadeIn(values, shift=DOWN * 0.2))
+            self.wait(1.5)
+            anchor = values
+        lines = VGroup(*[_tex(step, font_size=40) for step in steps]).arrange(DOWN, buff=0.35)
+        _fit(lines, 11, 3.6).next_to(anchor, DOWN, buff=0.5)
+        for line in lines:
+            self.play(Write(line))
+            self.wait(1.5)
+        if result:
+            answer = _fit(_tex(result, font_size=48, color=GREEN), 10, 1).to_edge(DOWN, buff=0.5)
+            self.play(Write(answer), Create(SurroundingRectangle(answer, color=GREEN, buff=0.2)))
+'''
+
+LIST_BODY = '''
+        title = _fit(Text(heading, font_size=46, color=TEAL)).to_edge(UP)
+        self.play(Write(title), run_time=2)
+        cards = VGroup(*[_card(item, TEAL) for item in items])
+        cards.arrange_in_grid(cols=2 if len(items) > 3 else 1, buff=0.4)
+        _fit(cards, 12, 5.4).next_to(title, DOWN, buff=0.6)
+        for card in cards:
+            self.play(FadeIn(card, shift=UP * 0.3))
+            self.wait(1.5)
+'''
+
+# LaTeX commands that reach outside the formula (files, shell, macros)
+UNSAFE_TEX = re.compile(
+    r"\\(input|include|write|immediate|openout|openin|read|def|edef|gdef|xdef|let|catcode|"
+    r"usepackage|newcommand|renewcommand|special|csname|directlua|loop)(?![a-zA-Z])"
+)
+
+# Functions and constants a graph slot may use, and their numpy names
+FUNCTIONS = {
+    "sin": "sin", "cos": "cos", "tan": "tan", "exp": "exp", "log": "log", "ln": "log",
+    "sqrt": "sqrt", "abs": "abs", "arctan": "arctan", "sinh": "sinh", "cosh": "cosh", "tanh": "tanh",
+}
+CONSTANTS = {"pi": "pi", "e": "e"}
+OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+GRAPH_SAMPLES = 96
+
+# numpy stand-in for checking a function with plain floats
+_math = SimpleNamespace(
+    sin=math.sin, cos=math.cos, tan=math.tan, exp=math.exp, log=math.log, sqrt=math.sqrt, abs=abs,
+    arctan=math.atan, sinh=math.sinh, cosh=math.cosh, tanh=math.tanh, pi=math.pi, e=math.e,
+)
+
+
+class _Code(str):
+    """A slot value that goes into the scene as source, not as a literal"""
+
+
+def _text(value, limit=60):
+    """Short on-screen text, or "" """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = f"{value:g}"
+    if not isinstance(value, str):
+        return ""
+    value = " ".join(value.split())
+    return value if len(value) <= limit else value[:limit - 1].rstrip() + "…"
+
+
+def _texts(value, max_items, limit=60):
+    if not isinstance(value, list):
+        return []
+    return [text for text in (_text(item, limit) for item in value) if text][:max_items]
+
+
+def _latex(value, limit=120):
+    """A formula for MathTex (without $ delimiters), or "" when unsafe or unbalanced"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = f"{value:g}"
+    if not isinstance(value, str):
+        return ""
+    value = value.strip().strip("$").strip()
+    if value.startswith("\\(") and value.endswith("\\)"):
+        value = value[2:-2].strip()
+    if not value or len(value) > limit or UNSAFE_TEX.search(value):
+        return ""
+    depth = 0
+    for char in re.sub(r"\\[{}]", "", value):
+        depth += {"{": 1, "}": -1}.get(char, 0)
+        if depth < 0:
+            return ""
+    return value if depth == 0 else ""
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _nice_step(span, ticks=6):
+    """A 1/2/5 x 10^n tick step giving about `ticks` ticks over span"""
+    raw = span / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+class _FunctionCheck(ast.NodeTransformer):
+    """Whitelist a graph expression in x and point its names at numpy"""
+
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name,
+                                 ast.Constant, ast.Load) + OPERATORS):
+            raise ValueError(f"{type(node).__name__} not allowed")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError("only numbers allowed")
+        # Floats overflow instead of computing huge integer powers
+        return ast.copy_location(ast.Constant(float(node.value)), node)
+
+    def visit_Name(self, node):
+        if node.id == "x":
+            return node
+        if node.id in CONSTANTS:
+            return ast.copy_location(ast.Attribute(ast.Name("np", ast.Load()), CONSTANTS[node.id], ast.Load()), node)
+        raise ValueError(f"unknown name {node.id}")
+
+    def visit_Call(self, node):
+        if not (isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS
+                and len(node.args) == 1 and not node.keywords):
+            raise ValueError("unknown function")
+        node.args = [self.visit(node.args[0])]
+        node.func = ast.copy_location(
+            ast.Attribute(ast.Name("np", ast.Load()), FUNCTIONS[node.func.id], ast.Load()), node.func
+        )
+        return node
+
+
+def parse_function(expression):
+    """numpy source for a graph slot like "0.5x^2 - sin(x)", or None"""
+    if not isinstance(expression, str) or not expression.strip() or len(expression) > 120:
+        return None
+    expression = expression.strip().replace("^", "**")
+    expression = re.sub(r"^\s*(?:y|f\(x\))\s*=", "", expression)
+    # Implicit products (2x, 3(x+1)), but not scientific notation (3e-2, 1.5E3)
+    expression = re.sub(r"(\d)(?![eE][+-]?\d)\s*([a-zA-Z(])", r"\1*\2", expression)
+    expression = re.sub(r"\)\s*([a-zA-Z(])", r")*\1", expression)
+    expression = expression.strip()
+    try:
+        tree = _FunctionCheck().visit(ast.parse(expression, mode="eval"))
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+
+def evaluate_function(source, x):
+    """A parsed graph function at x, or None if it isn't a finite real there"""
+    function = eval(compile(f"lambda x: {source}", "<graph slot>", "eval"), {"__builtins__": {}, "np": _math})
+    try:
+        y = function(x)
+    except (ArithmeticError, ValueError):
+        return None
+    return y if isinstance(y, float) and math.isfinite(y) else None
+
+
+def sample_function(source, x_min, x_max):
+    """The function at the plot's sample points, or None if it fails at any of them"""
+    step = (x_max - x_min) / GRAPH_SAMPLES
+    values = [evaluate_function(source, x) for x in [x_min + i * step for i in range(GRAPH_SAMPLES)] + [x_max]]
+    return None if None in values else values
+
+
+def fill_title(slots):
+    title = _text(slots.get("title"), 48)
+    if not title:
+        return None
+    return {"title": title, "subtitle": _text(slots.get("subtitle"), 70), "points": _texts(slots.get("points"), 4, 50)}
+
+
+def fill_formula(slots):
+    formula = _latex(slots.get("formula"))
+    if not formula:
+        return None
+    terms = []
+    for term in slots.get("terms") or []:
+        if isinstance(term, dict):
+            symbol, meaning = _latex(term.get("symbol"), 30), _text(term.get("meaning"), 50)
+            if symbol and meaning:
+                terms.append((symbol, meaning))
+    return {"formula": formula, "terms": terms[:4], "note": _text(slots.get("note"), 70)}
+
+
+def fill_graph(slots):
+    source = parse_function(slots.get("function"))
+    if source is None:
+        return None
+    x_range = slots.get("x_range")
+    x_min, x_max = (_number(x_range[0]), _number(x_range[1])) if isinstance(x_range, list) and len(x_range) == 2 \
+        else (-5.0, 5.0)
+    if x_min is None or x_max is None or not 0 < x_max - x_min <= 1e4:
+        x_min, x_max = -5.0, 5.0
+    values = sample_function(source, x_min, x_max)
+    if values is None:
+        return None
+
+    low, high = min(values), max(values)
+    if high - low > 1e6:
+        return None
+    pad = (high - low) * 0.1 or 1.0
+    y_step = _nice_step(high - low + 2 * pad)
+    y_min = math.floor((low - pad) / y_step) * y_step
+    y_max = math.ceil((high + pad) / y_step) * y_step
+
+    highlight = None
+    hx = _number(slots.get("highlight_x"))
+    if hx is not None and x_min <= hx <= x_max:
+        hy = evaluate_function(source, hx)
+        if hy is not None:
+            highlight = (hx, hy, f"({hx:g}, {hy:.3g})")
+    return {
+        "f": _Code(f"lambda x: {source}"),
+        "x_min": x_min, "x_max": x_max, "x_step": _nice_step(x_max - x_min),
+        "y_min": y_min, "y_max": y_max, "y_step": y_step,
+        "sample_step": (x_max - x_min) / GRAPH_SAMPLES,
+        "x_label": _text(slots.get("x_label"), 20) or "x",
+        "y_label": _text(slots.get("y_label"), 20) or "y",
+        "formula": _latex(slots.get("formula")),
+        "highlight": highlight,
+    }
+
+
+def fill_steps(slots):
+    steps = [step for step in (_latex(step) for step in slots.get("steps") or []) if step][:5]
+    if not steps:
+        return None
+    given = []
+    for value in slots.get("given") or []:
+        if isinstance(value, dict):
+            symbol, amount = _latex(value.get("symbol"), 30), _latex(value.get("value"), 40)
+            if symbol and amount:
+                given.append(f"{symbol} = {amount}")
+        elif _latex(value, 60):
+            given.append(_latex(value, 60))
+    return {
+        "problem": _text(slots.get("problem"), 60) or "Worked example",
+        "given": given[:4],
+        "steps": steps,
+        "result": _latex(slots.get("result")),
+    }
+
+
+def fill_list(slots):
+    items = _texts(slots.get("items"), 6, 40)
+    if not items:
+        return None
+    return {"heading": _text(slots.get("heading"), 40) or "Applications", "items": items}
+
+
+# name: (when to use it, slots as shown to GPT, fill, motion seconds, body)
+TEMPLATES = {
+    "title": (
+        "opening or summary card",
+        '{"title": str, "subtitle": str, "points": [up to 4 short key ideas]}',
+        fill_title,
+        lambda s: 4 + bool(s["subtitle"]) + (1 + 2.5 * len(s["points"]) if s["points"] else 0),
+        TITLE_BODY,
+    ),
+    "formula": (
+        "a key equation and what its symbols mean",
+        '{"formula": LaTeX, "terms": [{"symbol": LaTeX, "meaning": str}] (up to 4), "note": str}',
+        fill_formula,
+        lambda s: 5 + (1 + 2.5 * len(s["terms"]) if s["terms"] else 0) + bool(s["note"]),
+        FORMULA_BODY,
+    ),
+    "graph": (
+        "how one quantity changes with another",
+        '{"function": "expression in x, e.g. 0.5*x**2 - 1", "x_range": [min, max], "x_label": str, '
+        '"y_label": str, "formula": LaTeX, "highlight_x": number}',
+        fill_graph,
+        lambda s: 7 + bool(s["formula"]) + (2 if s["highlight"] else 0),
+        GRAPH_BODY,
+    ),
+    "steps": (
+        "a worked example with concrete values",
+        '{"problem": str, "given": [{"symbol": LaTeX, "value": LaTeX}] (up to 4), "steps": [LaTeX] (up to 5), '
+        '"result": LaTeX}',
+        fill_steps,
+        lambda s: 2 + (2.5 if s["given"] else 0) + 2.5 * len(s["steps"]) + bool(s["result"]),
+        STEPS_BODY,
+    ),
+    "list": (
+        "applications, examples or properties",
+        '{"heading": str, "items": [up to 6 short phrases]}',
+        fill_list,
+        lambda s: 2 + 2.5 * len(s["items"]),
+        LIST_BODY,
+    ),
+}
+
+SLOT_CATALOG = "".join(
+    f"  - {name} ({use}): {slots}\n" for name, (use, slots, _, _, _) in TEMPLATES.items()
+)
+
+
+def parse_slot_video(response):
+    """
+    The video in a slot reply: {"narration": str, "scenes": [{"template",
+    "narration", "slots"}, ...]} with every scene's slots checked and filled
+    in (scenes whose slots are unusable are dropped), or None.
+    """
+    match = re.search(r"\{[\s\S]*\}", response)
+    try:
+        video = json.loads(match.group(0)) if match else None
+    except ValueError:
+        return None
+    if not isinstance(video, dict) or not isinstance(video.get("narration"), str) or not video["narration"].strip():
+        return None
+
+    scenes = []
+    for index, scene in enumerate(video.get("scenes") or []):
+        if not isinstance(scene, dict) or scene.get("template") not in TEMPLATES:
+            print(f"⚠️ Slot scene {index + 1} has no known template, dropping it")
+            continue
+        slots = TEMPLATES[scene["template"]][2](scene.get("slots") if isinstance(scene.get("slots"), dict) else {})
+        if slots is None:
+            print(f"⚠️ Slot scene {index + 1} ({scene['template']}) has unusable slots, dropping it")
+            continue
+        narration = scene.get("narration") if isinstance(scene.get("narration"), str) else ""
+        scenes.append({"template": scene["template"], "narration": narration, "slots": slots})
+    if not scenes:
+        return None
+    return {"narration": video["narration"].strip(), "scenes": scenes[:MAX_SLOT_SCENES]}
+
+
+def build_slot_scenes(video):
+    """
+    Manim source for a parsed slot video. Each scene ends on a hold as long
+    as its share of the narration takes to say, so scenes are weighted by
+    their narration when fitted. Returns (source, scene class names).
+    """
+    words = [len(scene["narration"].split()) for scene in video["scenes"]]
+    if not all(words):
+        words = [len(video["narration"].split()) / len(video["scenes"])] * len(video["scenes"])
+
+    classes, names = [SCENE_PRELUDE], []
+    for index, (scene, count) in enumerate(zip(video["scenes"], words)):
+        _, _, _, motion, body = TEMPLATES[scene["template"]]
+        name = f"{scene['template'].capitalize()}Scene{index + 1}"
+        hold = max(1.0, round(count / WORDS_PER_SECOND - motion(scene["slots"]), 1))
+        assignments = "".join(
+            f"        {key} = {value if isinstance(value, _Code) else repr(value)}\n"
+            for key, value in scene["slots"].items()
+        )
+        classes.append(
+            f"\nclass {name}(Scene):\n    def construct(self):\n{assignments}{body}        self.wait({hold})\n"
+        )
+        names.append(name)
+    return "\n".join(classes), names
@@ -4,6 +4,21 @@ const textInput = document.getElementById("textInput");
 let mediaRecorder;
 let audioChunks = [];
 
+// Poll the background job started by /generate_audio until it finishes
+async function waitForJob(result) {
+    if (!result.job_id) {
+        return result;
+    }
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const response = await fetch(result.status_url);
+        const job = await response.json();
+        if (job.status === "done" || job.status === "failed" || !job.success) {
+            return job;
+        }
+    }
+}
+
 // Text input handler
 textBtn.addEventListener("click", async () => {
     const text = textInput.value.trim();
@@ -23,14 +38,14 @@ textBtn.addEventListener("click", async () => {
             body: JSON.stringify({ text: text })
         });
 
-        const result = await response.json();
+        const result = await waitForJob(await response.json());
         console.log("API Response:", result); // Debug log
 
         if (result.success && (result.video_url || result.videoUrl)) {
             document.getElementById("status").innerText = "✅ Animation ready!";
             const video = document.getElementById("outputVideo");
             const videoUrl = result.video_url || result.videoUrl;
-            video.src = videoUrl + "?t=" + new Date().getTime();
+            video.src = videoUrl; // Per-job URLs are unique, so no cache-busting needed
             video.style.display = "block";
             video.load(); // Force reload
         } else {
@@ -64,14 +79,14 @@ recordBtn.addEventListener("click", async () => {
                     body: formData
                 });
 
-                const result = await response.json();
+                const result = await waitForJob(await response.json());
                 console.log("API Response:", result); // Debug log
 
                 if (result.success && (result.video_url || result.videoUrl)) {
                     document.getElementById("status").innerText = "✅ Animation ready!";
                     const video = document.getElementById("outputVideo");
                     const videoUrl = result.video_url || result.videoUrl;
-                    video.src = videoUrl + "?t=" + new Date().getTime();
+                    video.src = videoUrl; // Per-job URLs are unique, so no cache-busting needed
                     video.style.display = "block";
                     video.load(); // Force reload
                 } else {
@@ -0,0 +1,72 @@
+# stream_utils.py
+
+import re
+
+
+# Same split as extract_explanation_and_code: explanation, then one ```python block
+FENCE_OPEN = re.compile(r"```(?:python)?\n")
+FENCE_CLOSE = "```"
+SCENE_CLASS = re.compile(r"^class\s+(\w+)\s*\(Scene\):", re.MULTILINE)
+
+
+class ResponseStreamParser:
+    """
+    Splits a GPT response into explanation and scene code while it streams in.
+
+    feed() takes each piece as it arrives. on_explanation(text) fires once,
+    as soon as the code fence opens. on_scene(class_name, source) fires for
+    every `class X(Scene):` block once the next class or the closing fence
+    shows it is complete. source is the block together with the code before
+    the first class (imports, helpers), so it runs on its own.
+    A response cut off before its closing fence never emits its last scene,
+    just as extract_explanation_and_code finds no code in it.
+    """
+
+    def __init__(self, on_explanation=None, on_scene=None):
+        self.on_explanation = on_explanation or (lambda text: None)
+        self.on_scene = on_scene or (lambda class_name, source: None)
+        self.explanation = None
+        self.scenes = []  # class names emitted so far
+        self.closed = False  # closing fence seen
+        self._pieces = []
+        self._code_start = None
+        self._code = ""
+
+    @property
+    def text(self):
+        return "".join(self._pieces)
+
+    def feed(self, piece):
+        self._pieces.append(piece)
+        if self.closed or not piece:
+            return
+
+        if self._code_start is None:
+            text = self.text
+            match = FENCE_OPEN.search(text)
+            if not match:
+                return
+            self._code_start = match.end()
+            self.explanation = text[:match.start()].strip()
+            self.on_explanation(self.explanation)
+            self._code = text[self._code_start:]
+        else:
+            self._code += piece
+
+        end = self._code.find(FENCE_CLOSE)
+        if end != -1:
+            self._code = self._code[:end]
+            self.closed = True
+        self._emit_scenes()
+
+    def _emit_scenes(self):
+        matches = list(SCENE_CLASS.finditer(self._code))
+        complete = len(matches) if self.closed else len(matches) - 1
+        if complete <= len(self.scenes):
+            return
+        prelude = self._code[:matches[0].start()]
+        for index in range(len(self.scenes), complete):
+            end = matches[index + 1].start() if index + 1 < len(matches) else len(self._code)
+            class_name = matches[index].group(1)
+            self.scenes.append(class_name)
+            self.on_scene(class_name, (prelude + self._code[matches[index].start():end]).strip() + "\n")
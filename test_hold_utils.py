@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import sys
+import types
+
+import pytest
+
+from hold_utils import elide_waits, expand_holds, fit_holds, holds_path, read_holds
+
+
+SCENE_SOURCE = '''class Renderer:
+    time = 0.0
+
+
+class Demo:
+    def __init__(self):
+        self.renderer = Renderer()
+
+    def wait(self, duration=1.0):
+        self.renderer.time += duration
+
+    def should_update_mobjects(self):
+        return False
+
+    def construct(self):
+        self.wait(0.5)
+        self.wait(3)
+        self.wait(duration=2.5)
+'''
+
+
+def test_elide_waits_round_trip(tmp_path, monkeypatch):
+    elided, count = elide_waits(SCENE_SOURCE)
+    assert count == 3
+    # Rewritten in place: the scene keeps its line numbers
+    original = SCENE_SOURCE.splitlines()
+    assert elided.splitlines()[:len(original)] == [
+        line.replace("self.wait(", "_voicemation_hold(self, ") for line in original
+    ]
+
+    # Run the elided scene against a stand-in for manim's config at 10 fps
+    config = types.SimpleNamespace(frame_rate=10, pixel_height=360, dry_run=False)
+    monkeypatch.setitem(sys.modules, "manim", types.SimpleNamespace(config=config))
+    path = str(tmp_path / "scene.py")
+    namespace = {"__file__": path, "__name__": "scene"}
+    exec(compile(elided, path, "exec"), namespace)
+    scene = namespace["Demo"]()
+    scene.construct()
+
+    # The short wait is rendered, the long ones leave one frame plus a recorded hold
+    holds = read_holds(holds_path(path, "Demo", 360, 10))
+    assert [frame for frame, _ in holds] == [6, 7]
+    assert [seconds for _, seconds in holds] == pytest.approx([2.9, 2.4])
+    assert scene.renderer.time + sum(seconds for _, seconds in holds) == pytest.approx(6.0)
+
+
+def test_elide_waits_leaves_other_code_alone():
+    assert elide_waits("self.wait(") == ("self.wait(", 0)
+    source = "def f(scene):\n    scene.wait(3)\n    self.wait(3, frozen_frame=False)\n"
+    assert elide_waits(source) == (source, 0)
+
+
+def test_fit_holds_scales_holds_to_the_target():
+    holds = [(6, 2.9), (7, 2.4)]
+    fitted, tail = fit_holds(holds, 0.7, 12.0)
+    assert tail == 0.0
+    assert [frame for frame, _ in fitted] == [6, 7]
+    assert sum(seconds for _, seconds in fitted) == pytest.approx(11.3)
+    assert fitted[0][1] / fitted[1][1] == pytest.approx(2.9 / 2.4)
+
+
+def test_fit_holds_without_room_or_holds():
+    # Motion alone is longer than the target: holds collapse to their rendered frame
+    assert fit_holds([(6, 2.9)], 8.0, 5.0) == ([(6, 0.0)], 0.0)
+    # Nothing to stretch: the last frame is held instead
+    assert fit_holds([], 3.0, 5.0) == ([], 2.0)
+
+
+def test_expand_holds_without_holds_copies(tmp_path):
+    source = tmp_path / "scene.mp4"
+    source.write_bytes(b"video")
+    output = expand_holds(str(source), [(6, 0.0)], str(tmp_path / "scene_fit.mp4"))
+    with open(output, "rb") as f:
+        assert f.read() == b"video"
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
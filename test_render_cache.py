@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import json
+import os
+
+import pytest
+
+import cache_utils
+import voicemation
+from cache_utils import DiskCache
+from hold_utils import hold_sidecar, holds_path
+
+
+SCENE_SOURCE = '''from manim import *
+
+
+class Demo(Scene):
+    def construct(self):
+        self.play(Create(Circle()))
+        self.wait(5)
+'''
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    """Empty render/holds caches under tmp_path and a fixed Manim version"""
+    monkeypatch.setattr(cache_utils, "CACHE_ROOT", str(tmp_path / "cache"))
+    monkeypatch.setattr(voicemation, "render_cache", DiskCache("renders", 1 << 20, suffix=".mp4"))
+    monkeypatch.setattr(voicemation, "holds_cache", DiskCache("holds", 1 << 20, suffix=".json"))
+    monkeypatch.setattr(voicemation, "get_manim_version", lambda: "test")
+
+
+def new_workspace(tmp_path, name):
+    workspace = tmp_path / name
+    workspace.mkdir()
+    path = workspace / "generated_manim_code.py"
+    path.write_text(SCENE_SOURCE, encoding="utf-8")
+    return str(path)
+
+
+def fake_render(render_path, scene_class, video_path, media_dir, timeout, tier="preview"):
+    """Stands in for Manim: writes the video and, for elided sources, one recorded hold"""
+    os.makedirs(os.path.dirname(video_path), exist_ok=True)
+    with open(video_path, "wb") as f:
+        f.write(b"rendered")
+    if "_elided_" in render_path:
+        _, _, height, fps = voicemation.RENDER_TIERS[tier]
+        with open(holds_path(render_path, scene_class, height, fps), "w") as f:
+            json.dump([[11, 4.9]], f)
+
+
+def no_render(*args, **kwargs):
+    raise AssertionError("a cached scene must not be rendered again")
+
+
+@pytest.mark.parametrize("elide", [True, False])
+def test_cache_hit_in_new_workspace(tmp_path, monkeypatch, caches, elide):
+    monkeypatch.setattr(voicemation, "ELIDE_WAITS", elide)
+    monkeypatch.setattr(voicemation, "render_scene_uncached", fake_render)
+    first = voicemation.render_scene(new_workspace(tmp_path, "first"), "Demo")
+
+    monkeypatch.setattr(voicemation, "render_scene_uncached", no_render)
+    second = voicemation.render_scene(new_workspace(tmp_path, "second"), "Demo")
+
+    assert second.startswith(str(tmp_path / "second"))
+    with open(second, "rb") as f:
+        assert f.read() == b"rendered"
+    with open(hold_sidecar(first)) as f, open(hold_sidecar(second)) as g:
+        assert json.load(f) == json.load(g) == ([[11, 4.9]] if elide else [])
+
+
+def test_other_scenes_keep_the_cache_key(tmp_path, monkeypatch, caches):
+    monkeypatch.setattr(voicemation, "render_scene_uncached", fake_render)
+    voicemation.render_scene(new_workspace(tmp_path, "first"), "Demo")
+
+    # Scenes appended (or placed before it) later don't change what Demo renders from
+    path = new_workspace(tmp_path, "second")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(SCENE_SOURCE.replace("class Demo", "class Intro(Scene):\n    pass\n\n\nclass Demo")
+                + "\n\nclass Outro(Scene):\n    def construct(self):\n        self.wait(1)\n")
+    monkeypatch.setattr(voicemation, "render_scene_uncached", no_render)
+    voicemation.render_scene(path, "Demo")
+    assert voicemation.scene_source(open(path).read(), "Demo") == SCENE_SOURCE
+
+
+def test_cache_hit_without_holds_renders_again(tmp_path, monkeypatch, caches):
+    monkeypatch.setattr(voicemation, "ELIDE_WAITS", True)
+    monkeypatch.setattr(voicemation, "render_scene_uncached", fake_render)
+    voicemation.render_scene(new_workspace(tmp_path, "first"), "Demo")
+    for name in os.listdir(voicemation.holds_cache.directory):
+        os.remove(os.path.join(voicemation.holds_cache.directory, name))
+
+    renders = []
+
+    def counting_render(*args, **kwargs):
+        renders.append(args)
+        fake_render(*args, **kwargs)
+
+    monkeypatch.setattr(voicemation, "render_scene_uncached", counting_render)
+    voicemation.render_scene(new_workspace(tmp_path, "second"), "Demo")
+    assert len(renders) == 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
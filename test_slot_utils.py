@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+from slot_utils import evaluate_function, parse_function
+
+
+def test_implicit_products():
+    assert parse_function("2x") == "2.0 * x"
+    assert parse_function("y = 3(x+1)") == "3.0 * (x + 1.0)"
+    assert parse_function("sin(x)cos(x)") == "np.sin(x) * np.cos(x)"
+
+
+def test_scientific_notation():
+    assert parse_function("3e-2*x") == "0.03 * x"
+    assert parse_function("1.5E3x") == "1500.0 * x"
+    assert parse_function("2e+1 - x") == "20.0 - x"
+    assert evaluate_function(parse_function("3e-2*x"), 10.0) == 0.3
+
+
+def test_rejected_expressions():
+    assert parse_function("__import__('os')") is None
+    assert parse_function("x.real") is None
+    assert evaluate_function(parse_function("9**9**9"), 1.0) is None
+    assert evaluate_function(parse_function("sqrt(x)"), -1.0) is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
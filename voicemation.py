@@ -1,76 +1,454 @@
 import os
 import re
+import ast
+import json
+import queue
 import subprocess
 import speech_recognition as sr
 import shutil
 import sys
 import time
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
-from voiceover_utils import generate_voiceover
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache_utils import DiskCache, hash_key, link_or_copy
+from workspace_utils import create_workspace
+from manim_worker import ManimWorkerPool, WorkerUnavailable
+from metrics_utils import timed, observe_size, track_cache, inc
+from sanitize_utils import sanitize_manim_code, InvalidManimCode
+from hls_utils import LivePlaylist
+from asr_utils import recognize_speech
+from llm_utils import LLM_BACKEND, LLM_MODEL, LLM_STREAM, LLM_TIMEOUT, LLMError, chat_completion, stream_chat_completion
+from stream_utils import ResponseStreamParser
+from slot_utils import MAX_SLOT_SCENES, SLOT_CATALOG, build_slot_scenes, parse_slot_video
+from hold_utils import (
+    ELIDE_WAITS, ELIDE_MIN_SECONDS, elide_waits, holds_path, read_holds, write_holds, hold_sidecar, fit_holds,
+    expand_holds, hold_last_frame
+)
+from hls_utils import HLS_SEGMENT_SECONDS, get_media_duration
 from dotenv import load_dotenv
 from mutagen.mp3 import MP3
 
 load_dotenv()
 
-def sanitize_manim_code(manim_code: str) -> str:
+
+def available_cpu_count():
+    """Cores this process may actually run on (respects cgroup/affinity limits)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Scene render concurrency: RENDER_SLOTS caps Manim processes host-wide,
+# SCENE_CPU_BUDGET caps how many of those slots a single job may hold.
+RENDER_SLOTS = int(os.environ.get("VOICEMATION_RENDER_SLOTS", str(available_cpu_count())))
+SCENE_CPU_BUDGET = int(os.environ.get("VOICEMATION_SCENE_CPU_BUDGET", str(RENDER_SLOTS)))
+_render_slots = threading.BoundedSemaphore(max(1, RENDER_SLOTS))
+
+# Render tiers: name -> (Manim quality flag, width, height, fps). Jobs return
+# the quick preview first; with FINAL_RENDER on (VOICEMATION_FINAL_RENDER=1),
+# every scene is re-rendered at the final tier in the background and the
+# result replaces the preview.
+RENDER_TIERS = {
+    "preview": ("-ql", 640, 360, 10),
+    "final": ("-qm", 1280, 720, 30),
+}
+FINAL_RENDER = os.environ.get("VOICEMATION_FINAL_RENDER", "0") == "1"
+# Final renders are low priority: a small pool, one scene at a time. At most
+# FINAL_QUEUE_MAX of them wait or run at once - past that a job keeps its
+# preview, so finals never pile up behind steady preview traffic
+_final_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("VOICEMATION_FINAL_WORKERS", "1")),
+    thread_name_prefix="final-render"
+)
+FINAL_QUEUE_MAX = int(os.environ.get("VOICEMATION_FINAL_QUEUE", "2"))
+_final_slots = threading.BoundedSemaphore(max(1, FINAL_QUEUE_MAX))
+
+# Rendered scenes keyed by (sanitized source, scene class, tier flags, Manim version)
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("VOICEMATION_RENDER_CACHE_MB", "2048")) * 1024 * 1024
+render_cache = DiskCache("renders", RENDER_CACHE_MAX_BYTES, suffix=".mp4")
+track_cache(render_cache)
+# Static holds elided from each cached render (restored when the scene is fitted)
+holds_cache = DiskCache("holds", 16 * 1024 * 1024, suffix=".json")
+
+# GPT responses keyed by (normalized speech, mode, model, system prompt hash)
+LLM_CACHE_MAX_BYTES = int(os.environ.get("VOICEMATION_LLM_CACHE_MB", "64")) * 1024 * 1024
+LLM_CACHE_TTL = int(os.environ.get("VOICEMATION_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+llm_cache = DiskCache("llm", LLM_CACHE_MAX_BYTES, suffix=".txt", ttl_seconds=LLM_CACHE_TTL)
+track_cache(llm_cache)
+_manim_version = None
+
+# Publish in-depth scenes to a live HLS playlist while later scenes still render
+HLS_LIVE = os.environ.get("VOICEMATION_HLS_LIVE", "1") == "1"
+
+# Long-lived processes with manim pre-imported; set VOICEMATION_WARM_MANIM=0 to
+# always shell out to the manim CLI instead
+WARM_MANIM = os.environ.get("VOICEMATION_WARM_MANIM", "1") == "1"
+manim_pool = ManimWorkerPool(RENDER_SLOTS)
+
+# Before the real render, each generated scene is dry-run; failures go back to
+# GPT for a fix, up to REPAIR_ATTEMPTS times within REPAIR_BUDGET_SECONDS
+REPAIR_ATTEMPTS = int(os.environ.get("VOICEMATION_REPAIR_ATTEMPTS", "2"))
+REPAIR_BUDGET_SECONDS = float(os.environ.get("VOICEMATION_REPAIR_BUDGET", "90"))
+DRY_RUN_TIMEOUT = 60
+
+# In-depth videos from slot JSON: GPT fills the slots of ready-made scene
+# templates instead of writing Manim code. Set VOICEMATION_SLOT_TEMPLATES=0
+# to have GPT write every scene's code.
+SLOT_TEMPLATES = os.environ.get("VOICEMATION_SLOT_TEMPLATES", "1") == "1"
+SLOT_MAX_TOKENS = int(os.environ.get("VOICEMATION_SLOT_MAX_TOKENS", "1500"))
+
+# In-depth videos: one short outline call (narration + scene plan), then a
+# small code call per scene, all in flight at once. Set
+# VOICEMATION_PARALLEL_SCENES=0 for the single long completion instead.
+PARALLEL_SCENES = os.environ.get("VOICEMATION_PARALLEL_SCENES", "1") == "1"
+OUTLINE_MAX_TOKENS = int(os.environ.get("VOICEMATION_OUTLINE_MAX_TOKENS", "1500"))
+SCENE_MAX_TOKENS = int(os.environ.get("VOICEMATION_SCENE_MAX_TOKENS", "1200"))
+MAX_PLANNED_SCENES = 6
+
+
+def get_manim_version():
+    """Installed Manim version, part of the render cache key"""
+    global _manim_version
+    if _manim_version is None:
+        try:
+            from importlib.metadata import version
+            _manim_version = version("manim")
+        except Exception:
+            _manim_version = "unknown"
+    return _manim_version
+
+
+def get_manim_command():
+    """Use manim from PATH (should work with venv) or fall back to module invocation"""
+    manim_exe = shutil.which("manim")
+    if manim_exe:
+        return [manim_exe]
+    # Use the current Python executable to run manim as a module
+    return [sys.executable, "-m", "manim"]
+
+
+def tier_flags(tier):
+    """Manim CLI flags for a render tier"""
+    quality_flag, width, height, fps = RENDER_TIERS[tier]
+    return [quality_flag, "-r", f"{width},{height}", "--fps", str(fps)]
+
+
+def scene_video_path(temp_file_path, scene_class, tier="preview"):
+    """Where Manim writes a scene rendered from temp_file_path (inside its workspace)"""
+    _, _, height, fps = RENDER_TIERS[tier]
+    workspace = os.path.dirname(temp_file_path)
+    module_name = os.path.splitext(os.path.basename(temp_file_path))[0]
+    return os.path.join(
+        workspace, "media", "videos", module_name, f"{height}p{fps}", f"{scene_class}.mp4"
+    )
+
+
+def estimate_scene_frames(source, scene_class, fps=RENDER_TIERS["preview"][3]):
     """
-    Cleans up common GPT mistakes for Manim v0.18 compatibility.
-    Ensures UTF-8 safe output.
+    Rough frame count of each self.play/self.wait in scene_class, in source order.
+    Manim writes one partial movie file per call, so render progress can be
+    read off how many partial files exist so far.
     """
-    # ✅ Force UTF-8 safe text by removing invalid characters
-    code = manim_code.encode("utf-8", "ignore").decode("utf-8")
-
-    # ✅ Common replacements for symbols that break Python
-    replacements = {
-        "×": "*",
-        "÷": "/",
-        "−": "-",
-        "‒": "-",
-        "–": "-",
-        "—": "-",
-        "“": '"',
-        "”": '"',
-        "‘": "'",
-        "’": "'",
-        "©": "(c)",
-        "™": "(tm)",
-        "°": "deg"
-    }
-    for bad, good in replacements.items():
-        code = code.replace(bad, good)
-
-    # ✅ Remove font_size arguments inside get_text()
-    code = re.sub(
-        r'get_text\(([^)]*?),\s*font_size\s*=\s*\d+\)',
-        r'get_text(\1).scale(0.7)',
-        code
-    )
+    match = re.search(rf"class\s+{re.escape(scene_class)}\s*\(Scene\):(.*?)(?=\nclass\s|\Z)", source, re.DOTALL)
+    body = match.group(1) if match else ""
+    frames = []
+    for call in re.finditer(r"self\.(play|wait)\(([^\n]*)", body):
+        kind, args = call.groups()
+        if kind == "wait":
+            seconds = re.match(r"\s*(?:duration\s*=\s*)?(\d+(?:\.\d+)?)", args)
+        else:
+            seconds = re.search(r"run_time\s*=\s*(\d+(?:\.\d+)?)", args)
+        value = float(seconds.group(1)) if seconds else 1.0
+        frames.append(max(1, int(round(value * fps))))
+    return frames
 
-    # ✅ Fix `get_text("txt", color=...)` → `.get_text("txt").set_color(...)`
-    code = re.sub(
-        r'get_text\("([^"]+)"\s*,\s*color\s*=\s*([A-Z_]+)\)',
-        r'get_text("\1").set_color(\2)',
-        code
-    )
 
-    # ✅ Remove dangerous indexing like equation[0], equation[2], etc.
-    # Replace with safer approaches
-    code = re.sub(
-        r'Indicate\([^,\[\]]+\[\d+\][^)]*\)',
-        'Indicate(equation)',
-        code
-    )
-    
-    # ✅ Remove complex indexing operations that often fail
-    code = re.sub(
-        r'\.play\(Indicate\([^,]+\[\d+\][^)]*\)\)',
-        '.play(Indicate(equation))',
-        code
-    )
+def watch_render_progress(partial_dir, animation_frames, on_frames, stop_event, interval=1.0):
+    """Report (frames_done, frames_total) while Manim fills partial_dir"""
+    frames_total = sum(animation_frames) or 1
+    last_reported = None
+    while not stop_event.wait(interval):
+        try:
+            finished = sum(1 for name in os.listdir(partial_dir) if name.endswith(".mp4"))
+        except OSError:
+            finished = 0
+        frames_done = min(sum(animation_frames[:finished]), frames_total)
+        if frames_done != last_reported:
+            on_frames(frames_done, frames_total)
+            last_reported = frames_done
+
+
+def make_frame_reporter(on_progress):
+    """
+    Returns for_scene(scene_class) -> on_frames(frames_done, frames_total) that
+    publishes all scenes' progress as on_progress(scenes={...}).
+    """
+    scenes = {}
+    lock = threading.Lock()
+
+    def for_scene(scene_class):
+        if on_progress is None:
+            return None
+
+        def on_frames(frames_done, frames_total):
+            with lock:
+                scenes[scene_class] = {"frames_done": frames_done, "frames_total": frames_total}
+                on_progress(scenes={name: dict(progress) for name, progress in scenes.items()})
+        return on_frames
+
+    return for_scene
+
+
+def scene_source(source, scene_class):
+    """
+    The part of a scene module that scene_class renders from: the module minus
+    every other Scene class. Adding, editing or reordering the other scenes
+    leaves it unchanged.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source
+    lines = source.splitlines(keepends=True)
+    dropped = set()
+    for node in tree.body:
+        if (isinstance(node, ast.ClassDef) and node.name != scene_class
+                and any(isinstance(base, ast.Name) and base.id == "Scene" for base in node.bases)):
+            first = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            last = node.end_lineno
+            # Take the blank lines after the class along, so the spacing stays the same
+            while last < len(lines) and not lines[last].strip():
+                last += 1
+            dropped.update(range(first - 1, last))
+    return "".join(line for index, line in enumerate(lines) if index not in dropped).rstrip() + "\n"
+
+
+def write_snapshot(prefix, source):
+    """Write source to <prefix>_<content hash>.py, unless it is already there, and return the path"""
+    path = f"{prefix}_{hash_key(source)[:12]}.py"
+    if not os.path.exists(path):
+        # Scenes of one file may get here at once - replace atomically
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(source)
+        os.replace(tmp_path, path)
+    return path
+
+
+def scene_snapshot(temp_file_path, scene_class):
+    """
+    (source, path) of scene_class's own module (scene_source), written next to
+    temp_file_path. Dry runs, renders and the render cache all use this
+    snapshot, so a scene file that changes later (streamed scenes are appended
+    while earlier ones render) can't change what a scene renders from.
+    """
+    with open(temp_file_path, "r", encoding="utf-8") as f:
+        source = scene_source(f.read(), scene_class)
+    base = os.path.splitext(temp_file_path)[0]
+    return source, write_snapshot(f"{base}_{scene_class}", source)
 
-    return code
+
+def render_cache_key(source, scene_class, tier="preview"):
+    # Elision settings change the rendered video (single-frame holds), so they are part of the key
+    elision = f"elide={ELIDE_MIN_SECONDS:g}" if ELIDE_WAITS else "elide=off"
+    return hash_key(source, scene_class, " ".join(tier_flags(tier)), get_manim_version(), elision)
+
+
+def render_scene(temp_file_path, scene_class, timeout=300, on_frames=None, tier="preview"):
+    """
+    Render one scene class at the given tier to MP4 and return its path.
+    Manim's media dir is scoped to the workspace holding temp_file_path.
+    The scene renders from its own snapshot (scene_snapshot); byte-identical
+    snapshots are served from render_cache without starting Manim.
+    on_frames(frames_done, frames_total), if given, receives estimated progress.
+    With ELIDE_WAITS, long static waits render a single frame; the holds are
+    recorded next to the video (hold_sidecar) and restored by fit_scene.
+    Raises subprocess.CalledProcessError / TimeoutExpired like subprocess.run.
+    """
+    media_dir = os.path.join(os.path.dirname(temp_file_path), "media")
+
+    source, snapshot_path = scene_snapshot(temp_file_path, scene_class)
+    cache_key = render_cache_key(source, scene_class, tier)
+
+    render_path = prepare_elided_source(snapshot_path, source) if ELIDE_WAITS else snapshot_path
+    video_path = scene_video_path(render_path, scene_class, tier)
+
+    animation_frames = estimate_scene_frames(source, scene_class, fps=RENDER_TIERS[tier][3])
+    frames_total = sum(animation_frames) or 1
+
+    # An elided render is only usable together with its holds - the two
+    # caches evict separately, so a render without them counts as a miss
+    cached_path = render_cache.get_path(cache_key)
+    cached_holds = holds_cache.get_bytes(cache_key) if cached_path else None
+    if cached_path and cached_holds is None and ELIDE_WAITS:
+        print(f"⚠️ Render cache entry for {scene_class} lost its holds, rendering again")
+        cached_path = None
+    if cached_path:
+        print(f"♻️ Render cache hit for {scene_class}")
+        if on_frames:
+            on_frames(frames_total, frames_total)
+        # Linking first also creates the media dir of a fresh workspace for the sidecar
+        link_or_copy(cached_path, video_path)
+        with open(hold_sidecar(video_path), "wb") as f:
+            f.write(cached_holds or b"[]")
+        return video_path
+
+    # The shared semaphore keeps concurrent jobs from oversubscribing the host's cores
+    with _render_slots, timed("scene_render", tier=tier):
+        stop_watching = threading.Event()
+        if on_frames:
+            on_frames(0, frames_total)
+            partial_dir = os.path.join(os.path.dirname(video_path), "partial_movie_files", scene_class)
+            threading.Thread(
+                target=watch_render_progress,
+                args=(partial_dir, animation_frames, on_frames, stop_watching),
+                daemon=True,
+            ).start()
+        _, _, height, fps = RENDER_TIERS[tier]
+        holds_file = holds_path(render_path, scene_class, height, fps)
+        if os.path.exists(holds_file):
+            os.remove(holds_file)  # left over from an earlier render
+        try:
+            render_scene_uncached(render_path, scene_class, video_path, media_dir, timeout, tier)
+        finally:
+            stop_watching.set()
+
+    if not os.path.exists(video_path):
+        return None
+    holds = read_holds(holds_file)
+    if holds:
+        print(f"⏩ {scene_class}: {len(holds)} static hold(s), {sum(s for _, s in holds):.0f}s not rendered by Manim")
+    write_holds(hold_sidecar(video_path), holds)
+    if on_frames:
+        on_frames(frames_total, frames_total)
+    observe_size("scene_video", os.path.getsize(video_path))
+    render_cache.put_file(cache_key, video_path)
+    holds_cache.put_bytes(cache_key, json.dumps(holds).encode("utf-8"))
+    return video_path
+
+
+def prepare_elided_source(snapshot_path, source):
+    """
+    Write the hold-eliding variant of a scene snapshot next to it and return
+    its path (or snapshot_path itself when no wait can be elided).
+    """
+    elided_source, count = elide_waits(source)
+    if not count:
+        return snapshot_path
+    return write_snapshot(f"{os.path.splitext(snapshot_path)[0]}_elided", elided_source)
+
+
+def render_scene_uncached(temp_file_path, scene_class, video_path, media_dir, timeout, tier="preview"):
+    """Run Manim for one scene, on a warm worker when available, else via the CLI"""
+    quality_flag, width, height, fps = RENDER_TIERS[tier]
+    rendered = False
+    if WARM_MANIM and manim_pool.enabled:
+        try:
+            print(f"🔥 Rendering {scene_class} ({tier}) on a warm Manim worker")
+            movie_path = manim_pool.render(
+                os.path.abspath(temp_file_path), scene_class, os.path.abspath(media_dir),
+                quality_flag, timeout=timeout, resolution=(width, height), frame_rate=fps
+            )
+            if os.path.abspath(movie_path) != os.path.abspath(video_path) and os.path.exists(movie_path):
+                link_or_copy(movie_path, video_path)
+            rendered = True
+        except WorkerUnavailable:
+            pass
+
+    if not rendered:
+        command = get_manim_command() + tier_flags(tier) + ["--media_dir", media_dir, temp_file_path, scene_class]
+        print("🎬 Running Manim command:", " ".join(command))
+        subprocess.run(command, capture_output=True, text=True, check=True, timeout=timeout)
+
+
+def validate_scene(temp_file_path, scene_class, timeout=DRY_RUN_TIMEOUT):
+    """
+    Run scene_class in Manim's dry-run mode: construct() executes but no frames
+    are rendered or written. Like render_scene, it runs the scene's own
+    snapshot. Returns None if it ran cleanly, else the error output.
+    """
+    source, snapshot_path = scene_snapshot(temp_file_path, scene_class)
+    if render_cache.get_path(render_cache_key(source, scene_class)):
+        return None  # rendered fine before
+
+    media_dir = os.path.join(os.path.dirname(temp_file_path), "media")
+    quality_flag, width, height, fps = RENDER_TIERS["preview"]
+    with _render_slots, timed("dry_run"):
+        try:
+            if WARM_MANIM and manim_pool.enabled:
+                try:
+                    manim_pool.render(
+                        os.path.abspath(snapshot_path), scene_class, os.path.abspath(media_dir),
+                        quality_flag, timeout=timeout, resolution=(width, height), frame_rate=fps,
+                        dry_run=True
+                    )
+                    return None
+                except WorkerUnavailable:
+                    pass
+            command = get_manim_command() + tier_flags("preview") + [
+                "--dry_run", "--media_dir", media_dir, snapshot_path, scene_class
+            ]
+            subprocess.run(command, capture_output=True, text=True, check=True, timeout=timeout)
+        except subprocess.CalledProcessError as e:
+            return (e.stderr or e.stdout or str(e)).strip()
+        except subprocess.TimeoutExpired:
+            # Slow is not broken - leave it to the real render
+            print(f"⏱ Dry run of {scene_class} timed out, skipping validation")
+    return None
+
+
+def validate_and_repair(manim_code, workspace, filename="generated_manim_code.py"):
+    """
+    Dry-run every scene in manim_code and send failures back to GPT for a fix,
+    within REPAIR_ATTEMPTS / REPAIR_BUDGET_SECONDS. The code is dry-run from
+    workspace/filename.
+    Returns (manim_code, error) - error is None once every scene ran cleanly.
+    """
+    if get_manim_version() == "unknown":
+        return manim_code, None  # no local Manim to dry-run with
+
+    start = time.time()
+    error = None
+    for attempt in range(REPAIR_ATTEMPTS + 1):
+        if attempt:
+            remaining = REPAIR_BUDGET_SECONDS - (time.time() - start)
+            if remaining <= 0:
+                print(f"⏱ Repair budget of {REPAIR_BUDGET_SECONDS:.0f}s used up")
+                break
+            print(f"🩹 Asking GPT to repair the scene (attempt {attempt}/{REPAIR_ATTEMPTS})")
+            try:
+                with timed("llm_repair"):
+                    # The repair call may only use what is left of the budget
+                    repaired = repair_manim_code(manim_code, error, timeout=remaining)
+            except Exception as e:
+                print(f"❌ Repair request failed: {e}")
+                break
+            if not repaired:
+                print("❌ Repair response had no code block")
+                break
+            try:
+                manim_code = sanitize_manim_code(repaired)
+            except InvalidManimCode as e:
+                manim_code, error = repaired, f"SyntaxError: {e}"
+                continue
+
+        temp_file_path = save_manim_code_to_temp_file(manim_code, workspace, filename)
+        scene_classes = extract_all_scene_classes(manim_code) or [extract_class_name(manim_code)]
+        error = None
+        for scene_class in scene_classes:
+            error = validate_scene(temp_file_path, scene_class)
+            if error:
+                inc("voicemation_dry_run_failures_total", help_text="Scenes that failed their dry run")
+                print(f"❌ Dry run of {scene_class} failed:\n{error[-1500:]}")
+                break
+        if error is None:
+            if attempt:
+                inc("voicemation_repairs_total", help_text="Scenes fixed by a GPT repair")
+                print(f"✅ Scene repaired after {attempt} attempt(s)")
+            return manim_code, None
+
+    return manim_code, error
 
 
 def force_convert_to_multiscene(single_scene_code: str, topic: str) -> str:
@@ -471,26 +849,232 @@ class {class_name}(Scene):
 
 
 # Function to process speech and trigger animations
-def process_speech(speech_text, in_depth_mode=False):
+def process_speech(speech_text, in_depth_mode=False, workspace=None, on_progress=None):
     if "exit" in speech_text.lower():
         print("Exiting program...")
         return None  # Stop listening, no video generated
 
+    # Isolate this run's files so concurrent requests never clobber each other
+    workspace = workspace or create_workspace()
+    report = on_progress or (lambda **fields: None)
+
     print(f"🧠 Sending speech to GPT for animation generation... (In Depth Mode: {in_depth_mode})")
-    gpt_response = get_gpt_response(speech_text, in_depth_mode)
-    
+    report(stage="llm")
+
+    if in_depth_mode and SLOT_TEMPLATES:
+        try:
+            video = get_slot_video(speech_text)
+        except LLMError as e:
+            print(f"⚠️ Slot request failed ({e})")
+            video = None
+        if video:
+            return render_slot_video(video, workspace, on_progress)
+        print("⚠️ No usable slot JSON - having GPT write the scene code instead")
+
+    if in_depth_mode and PARALLEL_SCENES:
+        try:
+            plan = get_video_plan(speech_text)
+        except LLMError as e:
+            print(f"⚠️ Scene plan request failed ({e})")
+            plan = None
+        if plan:
+            return render_planned_video(plan, speech_text, workspace, on_progress)
+        print("⚠️ No usable scene plan - falling back to a single in-depth completion")
+
+    # The reply streams in on a stage worker; its explanation and finished scene
+    # classes arrive here as events, so narration and renders start before it ends
+    events = queue.Queue()
+    llm_future = _stage_pool.submit(stream_gpt_response, speech_text, in_depth_mode, events)
+
+    event = events.get()
+    if event[0] == "explanation":
+        explanation = event[1]
+        # TTS only needs the explanation - run it while GPT is still writing code
+        narration_future = _stage_pool.submit(prepare_narration, explanation, workspace)
+
+        if in_depth_mode:
+            # In-depth scenes are built from the topic, not the generated code,
+            # so rendering can start as soon as the code block does
+            print("🎬 IN-DEPTH MODE: code block started - rendering the multi-scene version while GPT finishes")
+            manim_code = force_convert_to_multiscene("", speech_text)
+            temp_file_path = save_manim_code_to_temp_file(manim_code, workspace)
+            return run_manim(temp_file_path, extract_class_name(manim_code), explanation, on_progress, narration_future)
+
+        event = events.get()
+        if event[0] == "scene":
+            report(stage="validate")
+            scene_feed = streamed_scene_feed(event, events, llm_future, workspace)
+            temp_file_path = os.path.join(workspace, "generated_manim_code.py")
+            return run_manim(temp_file_path, event[1], explanation, on_progress, narration_future, scene_feed)
+    else:
+        narration_future = None
+
+    # No Scene class came through the stream (no code block, other base classes,
+    # a reply cut off before its closing fence): handle the whole reply at once
+    gpt_response = llm_future.result()
+    return process_gpt_response(gpt_response, speech_text, in_depth_mode, workspace, on_progress, narration_future)
+
+
+def stream_gpt_response(speech_text, in_depth_mode, events):
+    """
+    Stage: fetch GPT's reply through a ResponseStreamParser, posting
+    ("explanation", text) and ("scene", class_name, source) to events as they
+    complete, then ("done", None). Returns the whole reply.
+    """
+    parser = ResponseStreamParser(
+        on_explanation=lambda text: events.put(("explanation", text)),
+        on_scene=lambda class_name, source: events.put(("scene", class_name, source)),
+    )
+    try:
+        with timed("llm"):
+            gpt_response = get_gpt_response(speech_text, in_depth_mode, on_delta=parser.feed)
+        observe_size("llm_response", len(gpt_response.encode("utf-8")))
+        return gpt_response
+    finally:
+        events.put(("done", None))
+
+
+def streamed_scene_feed(event, events, llm_future, workspace):
+    """
+    Yield (scene class, scene file) for streamed scenes as each one passes
+    sanitizing and its dry run (with GPT repairs). Each scene is checked and
+    rendered on its own, from the module it was streamed with, so helpers of
+    different scenes can't clash. Scenes that stay broken are skipped.
+    A stream that breaks off ends the feed, so the scenes that made it still
+    become a video; the LLM error is only raised if no scene was yielded.
+    """
+    index = 0
+    while event[0] == "scene":
+        _, class_name, source = event
+        filename = f"stream_{index}.py"
+        try:
+            source, error = validate_and_repair(sanitize_manim_code(source), workspace, filename=filename)
+        except InvalidManimCode as e:
+            inc("voicemation_invalid_code_total", help_text="Generated Manim code rejected before rendering")
+            error = str(e)
+        if error or class_name not in extract_all_scene_classes(source):
+            print(f"❌ Streamed scene {class_name} still fails after repairs, skipping it")
+        else:
+            index += 1
+            yield class_name, save_manim_code_to_temp_file(source, workspace, filename)
+        event = events.get()
+    try:
+        llm_future.result()
+    except LLMError as e:
+        if not index:
+            raise
+        print(f"⚠️ GPT stream broke off after {index} scene(s) ({e}), making the video from those")
+
+
+def render_slot_video(video, workspace, on_progress=None):
+    """
+    In-depth mode from slot JSON: the template scenes need no dry run or
+    repairs, so narration and renders start as soon as the reply is parsed.
+    """
+    manim_code, scene_classes = build_slot_scenes(video)
+    print(f"🧩 Template scenes: {[scene['template'] for scene in video['scenes']]}")
+    narration_future = _stage_pool.submit(prepare_narration, video["narration"], workspace)
+    temp_file_path = save_manim_code_to_temp_file(manim_code, workspace)
+    return run_manim(temp_file_path, scene_classes[0], video["narration"], on_progress, narration_future)
+
+
+def render_planned_video(plan, speech_text, workspace, on_progress=None):
+    """
+    In-depth mode with a scene plan: the narration starts right away and every
+    scene's code is requested at once; each scene renders as soon as its code
+    has passed its dry run. Falls back to the built-in multi-scene version if
+    no planned scene makes it.
+    """
+    names = [scene["name"] for scene in plan["scenes"]]
+    print(f"🗺️ Scene plan: {names}")
+    narration_future = _stage_pool.submit(prepare_narration, plan["narration"], workspace)
+    futures = [
+        _scene_llm_pool.submit(generate_planned_scene, plan, index, speech_text, workspace)
+        for index in range(len(names))
+    ]
+    temp_file_path = os.path.join(workspace, "generated_manim_code.py")
+    video = run_manim(
+        temp_file_path, names[0], plan["narration"], on_progress, narration_future,
+        scene_feed=planned_scene_feed(futures, workspace), scene_order=names
+    )
+    if video:
+        return video
+
+    print("⚠️ No planned scene rendered - using the built-in multi-scene version")
+    manim_code = force_convert_to_multiscene("", speech_text)
+    temp_file_path = save_manim_code_to_temp_file(manim_code, workspace)
+    return run_manim(temp_file_path, extract_class_name(manim_code), plan["narration"], on_progress, narration_future)
+
+
+def generate_planned_scene(plan, index, speech_text, workspace):
+    """Stage: code for one planned scene, sanitized and dry-run (with repairs). Returns the source or None."""
+    name = plan["scenes"][index]["name"]
+    try:
+        code = get_scene_code(plan, index, speech_text)
+        if not code:
+            raise InvalidManimCode("no code block in the reply")
+        code = sanitize_manim_code(rename_scene_class(code, name))
+        code, error = validate_and_repair(code, workspace, filename=f"scene_{index}.py")
+    except (LLMError, InvalidManimCode) as e:
+        code, error = None, str(e)
+    if error or name not in extract_all_scene_classes(code):
+        inc("voicemation_planned_scene_failures_total", help_text="Planned in-depth scenes left out of the video")
+        print(f"❌ Planned scene {name} failed ({error or 'class missing'}), leaving it out")
+        return None
+    return code
+
+
+def planned_scene_feed(futures, workspace):
+    """
+    Yield (scene class, scene file) for planned scenes as their code becomes
+    ready. Each scene renders from its own scene_<index>.py, the module its
+    dry run passed in, so helpers of different scenes can't clash.
+    """
+    indexes = {future: index for index, future in enumerate(futures)}
+    for future in as_completed(futures):
+        source = future.result()
+        if source:
+            yield extract_class_name(source), save_manim_code_to_temp_file(
+                source, workspace, filename=f"scene_{indexes[future]}.py"
+            )
+
+
+def rename_scene_class(manim_code, name):
+    """Give the first Scene class the planned name, so scenes can't collide"""
+    match = re.search(r"class\s+(\w+)\s*\(Scene\):", manim_code)
+    if not match or match.group(1) == name:
+        return manim_code
+    return manim_code[:match.start(1)] + name + manim_code[match.end(1):]
+
+
+def process_gpt_response(gpt_response, speech_text, in_depth_mode, workspace, on_progress=None, narration_future=None):
+    """Sanitize, validate and render a complete GPT reply"""
+    report = on_progress or (lambda **fields: None)
+
     # Debug: Log the GPT response to see what we're getting
     print(f"\n📝 GPT Response Length: {len(gpt_response)} characters")
     print(f"📝 First 200 chars: {gpt_response[:200]}...")
     if in_depth_mode:
         print(f"🎬 IN-DEPTH MODE: Response should be much longer with multiple scenes")
 
-    # 🔹 Extract explanation + Manim code separately
-    explanation, manim_code = extract_explanation_and_code(gpt_response)
+    report(stage="extract")
+    with timed("sanitize_extract"):
+        # 🔹 Extract explanation + Manim code separately
+        explanation, manim_code = extract_explanation_and_code(gpt_response)
+
+        if manim_code:
+            # Sanitize Manim code for v0.18 and reject code that won't even compile
+            try:
+                manim_code = sanitize_manim_code(manim_code)
+            except InvalidManimCode as e:
+                inc("voicemation_invalid_code_total", help_text="Generated Manim code rejected before rendering")
+                print(f"❌ Generated Manim code is not valid Python ({e})")
+                if not in_depth_mode:
+                    return None
+                # In-depth mode rebuilds the scenes from a template, only the topic is kept
 
     if manim_code:
-        # Sanitize Manim code for v0.18
-        manim_code = sanitize_manim_code(manim_code)
+        observe_size("manim_code", len(manim_code.encode("utf-8")))
         
         # Debug: Check code length and content
         print(f"📊 Generated Manim code length: {len(manim_code)} characters")
@@ -523,11 +1107,19 @@ def process_speech(speech_text, in_depth_mode=False):
         if in_depth_mode and wait_count < 5:
             print(f"⚠️ WARNING: In-depth mode should have many more wait() statements for 2+ minute videos")
 
+        if not in_depth_mode:
+            # Catch runtime errors with a fast dry run (and let GPT fix them) before the real render
+            report(stage="validate")
+            manim_code, error = validate_and_repair(manim_code, workspace)
+            if error:
+                print("❌ Generated scene still fails after repairs, not rendering it")
+                return None
+
         class_name = extract_class_name(manim_code)
-        temp_file_path = save_manim_code_to_temp_file(manim_code)
+        temp_file_path = save_manim_code_to_temp_file(manim_code, workspace)
 
         # ✅ Pass the natural language explanation as narration
-        final_video_path = run_manim(temp_file_path, class_name, explanation)
+        final_video_path = run_manim(temp_file_path, class_name, explanation, on_progress, narration_future)
 
         return final_video_path  # ✅ Return video path back to Flask
     else:
@@ -548,28 +1140,212 @@ def extract_explanation_and_code(gpt_response):
     return gpt_response, None
 
 
-# Get GPT response using Azure AI Inference
-def get_gpt_response(speech_text, in_depth_mode=False):
-    print(f"🔄 Starting GPT request for: {speech_text[:50]}... (in_depth_mode={in_depth_mode})")
-    
-    endpoint = "https://models.github.ai/inference"
-    model = "gpt-4o"  # Fixed: was "gpt-4.1" which is invalid
-    token = os.environ["GITHUB_TOKEN"]
-    
-    print(f"🌐 Endpoint: {endpoint}")
-    print(f"🤖 Model: {model}")
-    print(f"🔑 Token exists: {bool(token)}")
+# Manim API rules shared by every prompt that asks GPT for scene code
+MANIM_CODE_RULES = (
+    "⚠️ Critical Manim rules:\n"
+    "- NEVER use 'height' or 'width' parameters in Axes() - use x_length and y_length instead\n"
+    "- Always use .scale() method for resizing objects\n"
+    "- Use only valid Manim Community v0.19.0 syntax\n"
+    "- Wrap ONLY the code in triple backticks\n"
+    "- Do NOT wrap the explanation in code blocks\n"
+    "- Include proper imports: from manim import *\n"
+    "- NEVER use indexing like equation[0], equation[2] - MathTex parts may not exist\n"
+    "- Use simple animations: Write, Create, FadeIn, FadeOut, Transform\n"
+    "- Test all object references before using them\n"
+    "- Keep animations simple and error-free\n"
+    "- CORRECT GRAPH SYNTAX: axes.plot(lambda x: x**2, color=BLUE) NOT axes.get_graph()\n"
+    "- CORRECT LINE SYNTAX: axes.get_vertical_line(axes.i2gp(x_val, graph)) NOT get_line_from_axis_to_axis()\n"
+    "- NEVER use parameters that don't exist in Manim Community v0.19.0\n"
+    "- For plotting functions use: axes.plot(function, x_range=[a,b], color=COLOR)\n"
+    "- For lines use: Line(start_point, end_point, color=COLOR)\n"
+    "- NEVER use get_graph() method - use axes.plot() instead\n"
+    "- NEVER use get_line_from_axis_to_axis() - use Line() or axes.get_vertical_line()\n"
+    "- AVOID complex indexing and part references that may not exist\n"
+    "- NEVER slice vertices like triangle.get_vertices()[0:2] - always use individual indices\n"
+    "- For positioning, use .next_to(object, direction) NOT .next_to(array_of_points, direction)\n"
+    "- Calculate midpoints manually: midpoint = (point1 + point2) / 2 if needed\n"
+    "- Use basic, simple Manim objects: Text, MathTex, Line, Circle, Rectangle\n"
+    "- Test with minimal, error-free animations first\n"
+    "- EXAMPLE WORKING TEMPLATE:\n"
+    "```python\n"
+    "from manim import *\n"
+    "class MyScene(Scene):\n"
+    "    def construct(self):\n"
+    "        # Create visual diagram instead of text-heavy content\n"
+    "        circle = Circle(radius=2, color=BLUE).set_fill(BLUE, opacity=0.5)\n"
+    "        square = Square(side_length=2, color=RED).set_fill(RED, opacity=0.5)\n"
+    "        self.play(Create(circle))\n"
+    "        self.wait(1)\n"
+    "        self.play(Transform(circle, square))\n"
+    "        self.wait(2)\n"
+    "```\n\n"
+)
+
+
+SLOT_SYSTEM_PROMPT = (
+    "You plan comprehensive educational videos built from ready-made animated scene templates.\n"
+    "Return ONLY a JSON object (no markdown, no code block) of this shape:\n"
+    '{"narration": "...", "scenes": [{"template": "formula", "narration": "...", "slots": {...}}]}\n\n'
+    "- narration: a comprehensive 200+ word spoken lecture covering theory, step-by-step examples and real-world applications\n"
+    "- Write the narration as a professor talking directly to a student; NEVER mention animations, scenes, Manim or code\n"
+    f"- scenes: 4 to {MAX_SLOT_SCENES} scenes in teaching order, each one of these templates (its slots after the colon):\n"
+    + SLOT_CATALOG +
+    "- Formulas, symbols, values and steps are LaTeX math without $ signs\n"
+    "- function is a Python expression in x using + - * / ** and sin, cos, tan, exp, log, sqrt, abs, pi, e\n"
+    "- Keep on-screen text short - the narration does the explaining\n"
+    "- narration (per scene): the consecutive part of the narration spoken during that scene\n"
+)
+
+OUTLINE_SYSTEM_PROMPT = (
+    "You plan comprehensive educational videos made of several short animated scenes.\n"
+    "Return ONLY a JSON object (no markdown, no code block) of this shape:\n"
+    '{"narration": "...", "scenes": [{"name": "IntroductionScene", "goal": "...", "visuals": "...", "narration": "..."}]}\n\n'
+    "- narration: a comprehensive 200+ word spoken lecture covering theory, step-by-step examples and real-world applications\n"
+    "- Write the narration as a professor talking directly to a student; NEVER mention animations, scenes, Manim or code\n"
+    f"- scenes: 4 to {MAX_PLANNED_SCENES} scenes in teaching order (introduction, theory, examples, applications, summary)\n"
+    "- name: a unique Python class name ending in 'Scene'\n"
+    "- goal: what the scene teaches\n"
+    "- visuals: the diagrams, shapes, graphs and transformations to show - PRIORITIZE VISUALS over on-screen text\n"
+    "- narration (per scene): the consecutive part of the narration spoken during that scene\n"
+)
+
+SCENE_SYSTEM_PROMPT = (
+    "You write ONE scene of a multi-scene educational animation in Manim Community v0.19.0.\n"
+    "Return only the Python code of that scene, inside triple backticks.\n\n"
+    "🎨 CRITICAL VISUAL DESIGN PHILOSOPHY:\n"
+    "- PRIORITIZE DIAGRAMS, SHAPES, GRAPHS, AND VISUAL ANIMATIONS over text\n"
+    "- The voiceover already provides spoken explanation - subtitles will show text\n"
+    "- Think of it as: 'Show, don't tell' - use visual representations\n\n"
+    "🎬 Scene rules:\n"
+    "- Write exactly ONE class deriving from Scene, with the class name you are given\n"
+    "- Only show what this scene's goal and narration cover - other scenes handle the rest\n"
+    "- Use self.wait() pauses so the scene runs about as long as its narration takes to say\n\n"
+    + MANIM_CODE_RULES
+)
+
+
+def get_slot_video(speech_text):
+    """
+    Slot call for in-depth mode: narration plus template slots per scene, as
+    parsed by slot_utils.parse_slot_video, or None when GPT's answer has no
+    usable scene. Raises LLMError. Cached like full replies.
+    """
+    cache_key = hash_key(normalize_speech_text(speech_text), "slots", LLM_MODEL, hash_key(SLOT_SYSTEM_PROMPT))
+    cached_response = llm_cache.get_bytes(cache_key)
+    if cached_response is not None:
+        print("♻️ LLM cache hit (slot video)")
+        return parse_slot_video(cached_response.decode("utf-8"))
+
+    with timed("llm_slots"):
+        response = chat_completion(
+            SLOT_SYSTEM_PROMPT,
+            f"Fill the video: {speech_text}",
+            max_tokens=SLOT_MAX_TOKENS,
+            temperature=0.7,
+            purpose="slots",
+        )
+    observe_size("llm_response", len(response.encode("utf-8")))
+    video = parse_slot_video(response)
+    if video:
+        llm_cache.put_bytes(cache_key, response.encode("utf-8"))
+    return video
+
 
+def get_video_plan(speech_text):
+    """
+    Outline call for in-depth mode. Returns {"narration": str, "scenes":
+    [{"name", "goal", "visuals", "narration"}, ...]}, or None when GPT's answer
+    isn't a usable plan. Raises LLMError. Cached like full replies.
+    """
+    cache_key = hash_key(normalize_speech_text(speech_text), "outline", LLM_MODEL, hash_key(OUTLINE_SYSTEM_PROMPT))
+    cached_response = llm_cache.get_bytes(cache_key)
+    if cached_response is not None:
+        print("♻️ LLM cache hit (scene plan)")
+        return parse_video_plan(cached_response.decode("utf-8"))
+
+    with timed("llm_outline"):
+        response = chat_completion(
+            OUTLINE_SYSTEM_PROMPT,
+            f"Plan the video: {speech_text}",
+            max_tokens=OUTLINE_MAX_TOKENS,
+            temperature=0.7,
+            purpose="outline",
+        )
+    plan = parse_video_plan(response)
+    if plan:
+        llm_cache.put_bytes(cache_key, response.encode("utf-8"))
+    return plan
+
+
+def parse_video_plan(response):
+    """The plan in an outline reply (tolerating a ```json fence), or None"""
+    match = re.search(r"\{[\s\S]*\}", response)
     try:
-        print("🔧 Creating ChatCompletionsClient...")
-        client = ChatCompletionsClient(
-            endpoint=endpoint,
-            credential=AzureKeyCredential(token),
+        plan = json.loads(match.group(0)) if match else None
+    except ValueError:
+        return None
+    if not isinstance(plan, dict) or not isinstance(plan.get("narration"), str) or not plan["narration"].strip():
+        return None
+    scenes = [scene for scene in plan.get("scenes") or [] if isinstance(scene, dict)][:MAX_PLANNED_SCENES]
+    if not scenes:
+        return None
+
+    names = set()
+    for index, scene in enumerate(scenes):
+        name = re.sub(r"\W", "", str(scene.get("name", "")))
+        if not name or not name[0].isalpha() or name in names or name == "Scene":
+            name = f"Part{index + 1}Scene"
+        names.add(name)
+        scene["name"] = name
+    return {"narration": plan["narration"].strip(), "scenes": scenes}
+
+
+def get_scene_code(plan, index, speech_text):
+    """Code for scene `index` of the plan (one small completion), or None. Raises LLMError."""
+    scene = plan["scenes"][index]
+    outline = "\n".join(
+        f"{number}. {other['name']}: {other.get('goal', '')}" for number, other in enumerate(plan["scenes"], 1)
+    )
+    user_message = (
+        f"Write {scene['name']} for the video on: {speech_text}\n\n"
+        f"Video outline:\n{outline}\n\n"
+        f"This is scene {index + 1} of {len(plan['scenes'])}.\n"
+        f"Goal: {scene.get('goal', '')}\n"
+        f"Visuals: {scene.get('visuals', '')}\n"
+        f"Narration spoken during this scene: {scene.get('narration', '')}"
+    )
+
+    cache_key = hash_key(user_message, "scene", LLM_MODEL, hash_key(SCENE_SYSTEM_PROMPT))
+    cached_response = llm_cache.get_bytes(cache_key)
+    if cached_response is not None:
+        print(f"♻️ LLM cache hit ({scene['name']})")
+        return extract_manim_code(cached_response.decode("utf-8"))
+
+    with timed("llm_scene"):
+        response = chat_completion(
+            SCENE_SYSTEM_PROMPT,
+            user_message,
+            max_tokens=SCENE_MAX_TOKENS,
+            temperature=0.7,
+            purpose="scene",
         )
-        print("✅ Client created successfully")
-    except Exception as e:
-        print(f"❌ Error creating client: {e}")
-        raise
+    code = extract_manim_code(response)
+    if code:
+        llm_cache.put_bytes(cache_key, response.encode("utf-8"))
+    return code
+
+
+# Get GPT response using Azure AI Inference
+def get_gpt_response(speech_text, in_depth_mode=False, on_delta=None):
+    """
+    GPT's reply (explanation + code block) for a request. With on_delta, the
+    reply is also passed on piece by piece as it streams in (in one piece on
+    a cache hit or with VOICEMATION_LLM_STREAM=0).
+    """
+    print(f"🔄 Starting GPT request for: {speech_text[:50]}... (in_depth_mode={in_depth_mode})")
+    
+    model = LLM_MODEL
+    print(f"🤖 Model: {model} ({LLM_BACKEND} backend)")
 
     # Create the base system message
     base_prompt = (
@@ -586,43 +1362,7 @@ def get_gpt_response(speech_text, in_depth_mode=False):
         "- Example: Instead of writing 'Pythagoras theorem: a² + b² = c²', SHOW a triangle with animated squares on each side\n"
         "- Example: Instead of text about gravity, SHOW animated objects falling with trajectory lines\n"
         "- Focus on visual storytelling through shapes, colors, movements, and mathematical visualizations\n\n"
-        "⚠️ Critical Manim rules:\n"
-        "- NEVER use 'height' or 'width' parameters in Axes() - use x_length and y_length instead\n"
-        "- Always use .scale() method for resizing objects\n"
-        "- Use only valid Manim Community v0.19.0 syntax\n"
-        "- Wrap ONLY the code in triple backticks\n"
-        "- Do NOT wrap the explanation in code blocks\n"
-        "- Include proper imports: from manim import *\n"
-        "- NEVER use indexing like equation[0], equation[2] - MathTex parts may not exist\n"
-        "- Use simple animations: Write, Create, FadeIn, FadeOut, Transform\n"
-        "- Test all object references before using them\n"
-        "- Keep animations simple and error-free\n"
-        "- CORRECT GRAPH SYNTAX: axes.plot(lambda x: x**2, color=BLUE) NOT axes.get_graph()\n"
-        "- CORRECT LINE SYNTAX: axes.get_vertical_line(axes.i2gp(x_val, graph)) NOT get_line_from_axis_to_axis()\n"
-        "- NEVER use parameters that don't exist in Manim Community v0.19.0\n"
-        "- For plotting functions use: axes.plot(function, x_range=[a,b], color=COLOR)\n"
-        "- For lines use: Line(start_point, end_point, color=COLOR)\n"
-        "- NEVER use get_graph() method - use axes.plot() instead\n"
-        "- NEVER use get_line_from_axis_to_axis() - use Line() or axes.get_vertical_line()\n"
-        "- AVOID complex indexing and part references that may not exist\n"
-        "- NEVER slice vertices like triangle.get_vertices()[0:2] - always use individual indices\n"
-        "- For positioning, use .next_to(object, direction) NOT .next_to(array_of_points, direction)\n"
-        "- Calculate midpoints manually: midpoint = (point1 + point2) / 2 if needed\n"
-        "- Use basic, simple Manim objects: Text, MathTex, Line, Circle, Rectangle\n"
-        "- Test with minimal, error-free animations first\n"
-        "- EXAMPLE WORKING TEMPLATE:\n"
-        "```python\n"
-        "from manim import *\n"
-        "class MyScene(Scene):\n"
-        "    def construct(self):\n"
-        "        # Create visual diagram instead of text-heavy content\n"
-        "        circle = Circle(radius=2, color=BLUE).set_fill(BLUE, opacity=0.5)\n"
-        "        square = Square(side_length=2, color=RED).set_fill(RED, opacity=0.5)\n"
-        "        self.play(Create(circle))\n"
-        "        self.wait(1)\n"
-        "        self.play(Transform(circle, square))\n"
-        "        self.wait(2)\n"
-        "```\n\n"
+        + MANIM_CODE_RULES +
         "⚠️ Critical explanation rules:\n"
         "- Write ONLY the educational content that should be spoken as voiceover\n"
         "- NEVER include meta-commentary like 'Here is a Manim animation' or 'This code demonstrates'\n"
@@ -741,35 +1481,89 @@ def get_gpt_response(speech_text, in_depth_mode=False):
 
     print(f"🔤 System message length: {len(system_message_content)} chars")
     print(f"📝 User message: {speech_text}...")
-    
+
+    # Popular topics repeat constantly - reuse an earlier answer when we have one
+    cache_key = hash_key(
+        normalize_speech_text(speech_text),
+        "in_depth" if in_depth_mode else "normal",
+        model,
+        hash_key(system_message_content),
+    )
+    cached_response = llm_cache.get_bytes(cache_key)
+    if cached_response is not None:
+        gpt_response = cached_response.decode("utf-8")
+        print(f"♻️ LLM cache hit ({len(gpt_response)} characters)")
+        if on_delta:
+            on_delta(gpt_response)
+        return gpt_response
+
     try:
-        print("🚀 Making API call to GitHub Models...")
+        print("🚀 Making API call...")
         
-        response = client.complete(
-            messages=[
-                SystemMessage(system_message_content),
-                UserMessage(f"{speech_text}" + (" - CREATE MULTIPLE SCENE CLASSES (4-6 scenes) FOR A COMPREHENSIVE 3-4 MINUTE IN-DEPTH EDUCATIONAL ANIMATION. MANDATORY SCENES: IntroScene, DefinitionScene, Example1Scene, Example2Scene, ApplicationScene, SummaryScene. Each scene should be 40-60 seconds with extensive visual content and wait times. Include detailed step-by-step examples, mathematical workings, graphs, and animations. MAKE THE VIDEO LONGER THAN THE VOICEOVER by adding rich visual content. MINIMUM 200+ LINES OF MANIM CODE ACROSS ALL SCENES." if in_depth_mode else "")),
-            ],
+        user_message = f"{speech_text}" + (" - CREATE MULTIPLE SCENE CLASSES (4-6 scenes) FOR A COMPREHENSIVE 3-4 MINUTE IN-DEPTH EDUCATIONAL ANIMATION. MANDATORY SCENES: IntroScene, DefinitionScene, Example1Scene, Example2Scene, ApplicationScene, SummaryScene. Each scene should be 40-60 seconds with extensive visual content and wait times. Include detailed step-by-step examples, mathematical workings, graphs, and animations. MAKE THE VIDEO LONGER THAN THE VOICEOVER by adding rich visual content. MINIMUM 200+ LINES OF MANIM CODE ACROSS ALL SCENES." if in_depth_mode else "")
+        completion_args = dict(
             temperature=0.7,
             top_p=1.0,
             max_tokens=4000 if in_depth_mode else 2000,  # Allow longer responses for in-depth mode
-            model=model
+            purpose="generate",
         )
+        # Pooled client with per-call deadline and retries (see llm_utils)
+        if on_delta and LLM_STREAM:
+            gpt_response = stream_completion(system_message_content, user_message, on_delta, **completion_args)
+        else:
+            gpt_response = chat_completion(system_message_content, user_message, **completion_args)
+            if on_delta:
+                on_delta(gpt_response)
         
         print("✅ API call successful!")
         
-    except Exception as e:
+    except LLMError as e:
         print(f"❌ API call failed: {e}")
-        print(f"❌ Error type: {type(e).__name__}")
+        print(f"❌ HTTP status: {e.status}")
         raise
 
-    gpt_response = response.choices[0].message.content
     print(f"\n📩 GPT Response Length: {len(gpt_response)} characters")
     print(f"📩 GPT Response:\n{gpt_response}\n")
     print(f"🔍 Response truncated?: {len(gpt_response) >= 3800}")  # Check if hitting token limit
+    if gpt_response and extract_explanation_and_code(gpt_response)[1]:  # don't cache unusable answers
+        llm_cache.put_bytes(cache_key, gpt_response.encode("utf-8"))
     return gpt_response
 
 
+def stream_completion(system, user, on_delta, **kwargs):
+    """stream_chat_completion, handing each piece to on_delta; returns the whole reply"""
+    pieces = []
+    for piece in stream_chat_completion(system, user, **kwargs):
+        pieces.append(piece)
+        on_delta(piece)
+    return "".join(pieces)
+
+
+def repair_manim_code(manim_code, error, timeout=LLM_TIMEOUT):
+    """
+    Ask GPT to fix manim_code given the traceback it raised. Returns the new
+    code or None. Raises LLMError, e.g. when the call overruns timeout seconds.
+    """
+    response = chat_completion(
+        "You fix broken Manim Community v0.19.0 scenes.\n"
+        "- Return the COMPLETE corrected Python file inside one ```python code block\n"
+        "- Keep every scene class name and the overall animation unchanged\n"
+        "- Fix only what the error points at; no explanation outside the code block",
+        f"```python\n{manim_code}\n```\n\nRunning it fails with:\n{error[-3000:]}",
+        max_tokens=4000,
+        temperature=0.2,
+        timeout=timeout,
+        purpose="repair",
+    )
+    return extract_manim_code(response)
+
+
+def normalize_speech_text(speech_text):
+    """Case/whitespace/punctuation-insensitive form of a request, for cache keys"""
+    text = re.sub(r"\s+", " ", speech_text.lower()).strip()
+    return text.strip(" .!?,;:")
+
+
 # Extract only Python code block from GPT response
 def extract_manim_code(gpt_response):
     match = re.search(r"```(?:python)?\n([\s\S]*?)```", gpt_response)
@@ -790,14 +1584,17 @@ def extract_class_name(manim_code):
     return "Scene"
 
 
-# Save code to a temp .py file
-def save_manim_code_to_temp_file(manim_code):
+# Save code to a .py file in the run's workspace
+def save_manim_code_to_temp_file(manim_code, workspace=None, filename="generated_manim_code.py"):
     temp_file_path = os.path.join(
-        os.getenv("TEMP", "/tmp"),
-        "generated_manim_code.py"
+        workspace or create_workspace(),
+        filename
     )
-    with open(temp_file_path, "w", encoding="utf-8") as file:
+    # Streamed scenes render from this file while later ones are appended - replace atomically
+    tmp_path = f"{temp_file_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
         file.write(manim_code)
+    os.replace(tmp_path, temp_file_path)
     print(f"📁 Saved Manim code to: {temp_file_path}")
     return temp_file_path
 
@@ -809,14 +1606,64 @@ def get_audio_duration(audio_path):
 
 
 # Run the Manim animation
-from voiceover_utils import generate_voiceover, add_voiceover_to_video, generate_srt_file
-
-def run_manim(temp_file_path, class_name, explanation):
+from voiceover_utils import prepare_narration, subtitle_filter
+
+# Pipeline DAG:
+#   extract text -> [narration (TTS -> SRT)] || [scene renders] -> concat + mux
+# The narration branch only needs the explanation, so it runs on this pool
+# while Manim renders and is joined right before muxing.
+_stage_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("VOICEMATION_STAGE_WORKERS", "8")),
+    thread_name_prefix="pipeline-stage"
+)
+
+# Per-scene GPT calls (+ their dry runs) of planned in-depth videos - mostly
+# waiting on the network, so wider than the stage pool
+_scene_llm_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("VOICEMATION_SCENE_LLM_WORKERS", "16")),
+    thread_name_prefix="scene-llm"
+)
+
+
+def run_manim(temp_file_path, class_name, explanation, on_progress=None, narration_future=None, scene_feed=None,
+              scene_order=None):
     """
     Run manim to generate video and then merge it with AI narration.
     For multi-scene content, detect all scene classes and concatenate them.
+    on_progress(**fields), if given, receives pipeline progress (e.g. the
+    live playlist path once the first scene is playable).
+    narration_future is the already running narration stage, if any.
+    scene_feed, if given, yields (scene class, scene file) pairs (streamed
+    replies, planned scenes); each scene renders from its file as soon as it
+    arrives. scene_order is the video order when they arrive out of order.
     Returns the path to the final video with voiceover.
     """
+    if on_progress:
+        on_progress(stage="render")
+
+    # Start TTS + SRT now (unless already running) so narration is off the render critical path
+    workspace = os.path.dirname(temp_file_path)
+    if narration_future is None:
+        narration_future = _stage_pool.submit(prepare_narration, explanation, workspace)
+
+    if scene_feed is not None:
+        scene_files = {}
+
+        def feed_scenes():
+            for scene_class, scene_path in scene_feed:
+                scene_files[scene_class] = scene_path
+                yield scene_class
+
+        preview = run_multi_scene_manim(
+            temp_file_path, feed_scenes(), explanation, narration_future, on_progress, scene_order, scene_files
+        )
+        if not preview:
+            return None
+        scene_classes = list(scene_files)
+        if scene_order:
+            scene_classes = [scene_class for scene_class in scene_order if scene_class in scene_files]
+        return finish_preview(preview, temp_file_path, scene_classes, narration_future, on_progress, scene_files)
+
     # Check if this is a multi-scene file
     with open(temp_file_path, 'r') as f:
         content = f.read()
@@ -825,10 +1672,177 @@ def run_manim(temp_file_path, class_name, explanation):
     
     if len(scene_classes) > 1:
         print(f"🎬 Multi-scene detected! Found {len(scene_classes)} scenes: {scene_classes}")
-        return run_multi_scene_manim(temp_file_path, scene_classes, explanation)
+        preview = run_multi_scene_manim(temp_file_path, scene_classes, explanation, narration_future, on_progress)
     else:
         # Single scene - use original logic
-        return run_single_scene_manim(temp_file_path, class_name, explanation)
+        scene_classes = [class_name]
+        preview = run_single_scene_manim(temp_file_path, class_name, explanation, narration_future, on_progress)
+    return finish_preview(preview, temp_file_path, scene_classes, narration_future, on_progress)
+
+
+def finish_preview(preview, temp_file_path, scene_classes, narration_future, on_progress=None, scene_files=None):
+    """
+    Queue the final-quality render behind a finished preview and return the
+    preview. With FINAL_QUEUE_MAX finals already queued, the final is skipped.
+    """
+    if preview and FINAL_RENDER:
+        if not _final_slots.acquire(blocking=False):
+            print(f"⏭️ {FINAL_QUEUE_MAX} final render(s) already queued, shipping the preview only")
+            if on_progress:
+                on_progress(final_status="skipped")
+            return preview
+        if on_progress:
+            on_progress(final_status="rendering")
+        _final_pool.submit(queued_final, temp_file_path, scene_classes, narration_future, on_progress, scene_files)
+    return preview
+
+
+def queued_final(*args):
+    """render_final for a job holding one of the _final_slots"""
+    try:
+        return render_final(*args)
+    finally:
+        _final_slots.release()
+
+
+def render_final(temp_file_path, scene_classes, narration_future, on_progress=None, scene_files=None):
+    """
+    Background job: re-render every scene at the final tier and mux it with the
+    preview's narration. Reports on_progress(final=path, final_status="done")
+    so the higher quality video replaces the preview. scene_files maps scenes
+    that don't live in temp_file_path to their own file.
+    """
+    report = on_progress or (lambda **fields: None)
+    workspace = os.path.dirname(temp_file_path)
+    if not os.path.isdir(workspace):
+        # Pruned (see workspace_utils) while the final waited in the queue
+        print(f"⚠️ Workspace {workspace} is gone, keeping the preview")
+        report(final_status="failed")
+        return None
+    try:
+        with timed("final_render"):
+            narration_path, srt_path = narration_future.result()
+            targets = scene_targets(temp_file_path, scene_classes, get_audio_duration(narration_path), scene_files)
+            scene_videos = []
+            offset = 0.0
+            for scene_class, target in zip(scene_classes, targets):
+                video_path = render_scene(
+                    scene_file(temp_file_path, scene_class, scene_files), scene_class, timeout=900, tier="final"
+                )
+                if not video_path:
+                    raise RuntimeError(f"final render of {scene_class} produced no video")
+                fitted_path, duration = fit_scene(video_path, target, offset, srt_path)
+                scene_videos.append(fitted_path)
+                offset += duration
+
+            output_dir = os.path.join(workspace, "final")
+            os.makedirs(output_dir, exist_ok=True)
+            final_output = concat_and_mux_scenes(scene_videos, narration_path, output_dir=output_dir)
+        if not final_output:
+            raise RuntimeError("final mux failed")
+    except Exception as e:
+        print(f"⚠️ Final render failed, keeping the preview: {e}")
+        report(final_status="failed")
+        return None
+
+    print(f"🎉 Final quality video ready at: {final_output}")
+    report(final=final_output, final_status="done")
+    return final_output
+
+
+def publish_scene(live_playlist, video_path, narration_path, on_progress=None):
+    """
+    Append a fitted scene (subtitles already burned in) to the live HLS playlist.
+    Returns the playlist, or None if packaging failed (the final MP4 is still produced).
+    """
+    try:
+        with timed("hls_segment"):
+            live_playlist.append_scene(video_path, narration_path)
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        print(f"⚠️ Live playlist disabled for this job: {e}")
+        return None
+    if on_progress and live_playlist.scene_count == 1:
+        on_progress(playlist=live_playlist.path)
+    return live_playlist
+
+
+def wait_for_narration(narration_future, explanation, workspace=None):
+    """Join the narration stage, running it inline if it was never started"""
+    if narration_future is None:
+        return prepare_narration(explanation, workspace)
+    start = time.time()
+    narration_path, srt_path = narration_future.result()
+    print(f"🔊 Narration ready (waited {time.time() - start:.1f}s after render)")
+    return narration_path, srt_path
+
+
+def scene_file(temp_file_path, scene_class, scene_files=None):
+    """The file scene_class renders from: its own file in scene_files, else temp_file_path"""
+    return (scene_files or {}).get(scene_class, temp_file_path)
+
+
+def scene_targets(temp_file_path, scene_classes, narration_seconds, scene_files=None):
+    """
+    Split the narration across scenes in proportion to their scripted length
+    (plays + waits), so each scene can be fitted as soon as it has rendered.
+    """
+    sources = {}
+    for scene_class in scene_classes:
+        path = scene_file(temp_file_path, scene_class, scene_files)
+        if path not in sources:
+            with open(path, "r", encoding="utf-8") as f:
+                sources[path] = f.read()
+    weights = [
+        sum(estimate_scene_frames(sources[scene_file(temp_file_path, scene_class, scene_files)], scene_class)) or 1
+        for scene_class in scene_classes
+    ]
+    total = sum(weights)
+    return [narration_seconds * weight / total for weight in weights]
+
+
+def fit_scene(video_path, target_seconds, offset=0.0, srt_path=None):
+    """
+    Make a rendered scene last exactly target_seconds: its elided holds are
+    rescaled (or its last frame held) and the subtitles for its span of the
+    narration are burned in, all in one encode. offset is where the scene
+    starts in the narration. Returns (fitted video path, duration).
+    """
+    motion_seconds = get_media_duration(video_path)
+    holds, tail_seconds = fit_holds(read_holds(hold_sidecar(video_path)), motion_seconds, target_seconds)
+    duration = motion_seconds + sum(seconds for _, seconds in holds) + tail_seconds
+
+    fitted_path = os.path.splitext(video_path)[0] + "_fit.mp4"
+    with timed("fit_scene"):
+        expand_holds(
+            video_path, holds, fitted_path, tail_seconds, narration_subtitles(srt_path, offset),
+            keyframe_interval=HLS_SEGMENT_SECONDS
+        )
+    print(f"📐 Scene fitted to {duration:.1f}s (target {target_seconds:.1f}s, rendered motion {motion_seconds:.1f}s)")
+    return fitted_path, duration
+
+
+def hold_scene_end(video_path, seconds, offset=0.0, srt_path=None):
+    """
+    A clip holding the last frame of a fitted scene for seconds (subtitles of
+    that span burned in), to play after it. offset is where the clip starts
+    in the narration. Returns (clip path, duration).
+    """
+    hold_path = os.path.splitext(video_path)[0] + "_hold.mp4"
+    with timed("fit_scene"):
+        hold_last_frame(
+            video_path, seconds, hold_path, narration_subtitles(srt_path, offset),
+            keyframe_interval=HLS_SEGMENT_SECONDS
+        )
+    print(f"📐 Holding the last frame for {seconds:.1f}s")
+    return hold_path, seconds
+
+
+def narration_subtitles(srt_path, offset):
+    """ffmpeg filter burning in the subtitles of a clip that starts offset seconds into the narration"""
+    if not (srt_path and os.path.exists(srt_path)):
+        return None
+    # Shift into narration time so the cues line up, then back to zero
+    return f"setpts=PTS+{offset:.3f}/TB,{subtitle_filter(srt_path)},setpts=PTS-STARTPTS"
 
 
 def extract_all_scene_classes(manim_code):
@@ -839,36 +1853,30 @@ def extract_all_scene_classes(manim_code):
     return matches
 
 
-def run_single_scene_manim(temp_file_path, class_name, explanation):
+def run_single_scene_manim(temp_file_path, class_name, explanation, narration_future=None, on_progress=None):
     """Run single scene Manim animation"""
-    # Use manim from PATH (should work with venv) or fall back to module invocation
-    manim_exe = shutil.which("manim")
-    if manim_exe:
-        command = [manim_exe, "-ql", temp_file_path, class_name]
-    else:
-        # Use the current Python executable to run manim as a module
-        command = [sys.executable, "-m", "manim", "-ql", temp_file_path, class_name]
-    video_output_path = os.path.join(
-        "media", "videos", "generated_manim_code", "480p15", f"{class_name}.mp4"
-    )
-
     try:
-        print("🎬 Running single scene Manim command:", " ".join(command))
+        print(f"🎬 Rendering single scene: {class_name}")
         # Increase timeout for longer in-depth animations
         timeout_duration = 300  # 5 minutes for complex animations
-        subprocess.run(command, capture_output=True, text=True, check=True, timeout=timeout_duration)
+        video_output_path = render_scene(
+            temp_file_path, class_name, timeout=timeout_duration,
+            on_frames=make_frame_reporter(on_progress)(class_name)
+        )
+        if not video_output_path:
+            print(f"❌ Scene {class_name} video not found")
+            return None
         print("\n✅ Manim animation complete.\n")
 
-        # Generate voiceover
-        narration_path = generate_voiceover(explanation)
+        # Voiceover + subtitles (usually already finished while Manim rendered)
+        workspace = os.path.dirname(temp_file_path)
+        narration_path, srt_path = wait_for_narration(narration_future, explanation, workspace)
+        if on_progress:
+            on_progress(stage="mux")
 
-        # Merge video with voiceover and subtitles (using ffmpeg)
-        final_output = add_voiceover_to_video(
-            video_output_path, 
-            narration_path,
-            add_subtitles=True,
-            subtitle_text=explanation
-        )
+        # Stretch the scene to the narration's length (burning in subtitles), then stream-copy mux
+        fitted_path, _ = fit_scene(video_output_path, get_audio_duration(narration_path), srt_path=srt_path)
+        final_output = concat_and_mux_scenes([fitted_path], narration_path, output_dir=workspace)
 
         if final_output:
             print(f"🎉 Final video ready at: {final_output}")
@@ -887,62 +1895,114 @@ def run_single_scene_manim(temp_file_path, class_name, explanation):
         return None
 
 
-def run_multi_scene_manim(temp_file_path, scene_classes, explanation):
-    """Run multiple scenes and concatenate them into one video"""
-    manim_exe = shutil.which("manim")
-    if not manim_exe:
-        manim_exe = [sys.executable, "-m", "manim"]
-    else:
-        manim_exe = [manim_exe]
-    
-    scene_videos = []
-    
+def run_multi_scene_manim(temp_file_path, scene_classes, explanation, narration_future=None, on_progress=None,
+                          scene_order=None, scene_files=None):
+    """
+    Run multiple scenes and concatenate them into one video.
+    scene_classes may be a generator (streamed replies, planned scenes): each
+    scene is submitted for rendering as soon as it is yielded, and scene_order
+    (if given) puts them back in video order afterwards. scene_files maps
+    scenes that don't live in temp_file_path to their own file (filled in by
+    the time a scene is yielded).
+    With HLS_LIVE enabled, each scene is also published to a live HLS
+    playlist as soon as it and every scene before it have rendered.
+    """
+    frame_reporter = make_frame_reporter(on_progress)
+    streamed = not isinstance(scene_classes, list)
+    scene_count = "?" if streamed else len(scene_classes)
+
+    def render_one(index, scene_class):
+        # Each scene is an independent Manim process
+        print(f"🎬 Rendering scene {index+1}/{scene_count}: {scene_class}")
+        video_path = render_scene(
+            scene_file(temp_file_path, scene_class, scene_files), scene_class, on_frames=frame_reporter(scene_class)
+        )
+        if video_path:
+            print(f"✅ Scene {scene_class} rendered successfully")
+        else:
+            print(f"❌ Scene {scene_class} video not found")
+        return video_path
+
+    playlist = None
     try:
-        # Generate each scene
-        for i, scene_class in enumerate(scene_classes):
-            print(f"🎬 Rendering scene {i+1}/{len(scene_classes)}: {scene_class}")
-            command = manim_exe + ["-ql", temp_file_path, scene_class]
-            
-            subprocess.run(command, capture_output=True, text=True, check=True, timeout=300)
-            
-            video_path = os.path.join(
-                "media", "videos", "generated_manim_code", "480p15", f"{scene_class}.mp4"
-            )
-            
-            if os.path.exists(video_path):
-                scene_videos.append(video_path)
-                print(f"✅ Scene {scene_class} rendered successfully")
-            else:
-                print(f"❌ Scene {scene_class} video not found")
+        # Render scenes concurrently; map() keeps results in scene order for concatenation
+        workers = max(1, SCENE_CPU_BUDGET if streamed else min(len(scene_classes), SCENE_CPU_BUDGET))
+        print(f"⚡ Rendering {scene_count} scenes with {workers} parallel workers")
+        workspace = os.path.dirname(temp_file_path)
+        playlist = LivePlaylist(os.path.join(workspace, "hls")) if HLS_LIVE else None
+        live_playlist = playlist  # None once publishing failed
+        narration_path = srt_path = targets = None
+        offset = 0.0
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="manim-scene") as pool:
+            futures = []
+            submitted = []
+            for index, scene_class in enumerate(scene_classes):
+                futures.append(pool.submit(render_one, index, scene_class))
+                submitted.append(scene_class)
+            if scene_order:
+                ranked = sorted(zip(submitted, futures), key=lambda pair: scene_order.index(pair[0]))
+                submitted = [scene_class for scene_class, _ in ranked]
+                futures = [future for _, future in ranked]
+            scene_classes = submitted
+            scene_videos = []
+            gap = []  # scenes that failed since the last rendered one
+            # Walk scenes in order: each one is fitted to its share of the narration
+            # and published the moment it and its predecessors are done. A failed
+            # scene's share goes to the next rendered scene, so video and
+            # narration stay the same length
+            for index, future in enumerate(futures):
+                try:
+                    video_path = future.result()
+                except subprocess.CalledProcessError as e:
+                    print(f"❌ Scene {scene_classes[index]} failed to render, leaving it out")
+                    print("Errors:", e.stderr)
+                    video_path = None
+                except Exception as e:
+                    print(f"❌ Scene {scene_classes[index]} failed to render ({e}), leaving it out")
+                    video_path = None
+                if not video_path:
+                    gap.append(index)
+                    continue
+                if targets is None:
+                    # Voiceover + subtitles (usually already finished while Manim rendered)
+                    narration_path, srt_path = wait_for_narration(narration_future, explanation, workspace)
+                    targets = scene_targets(
+                        temp_file_path, scene_classes, get_audio_duration(narration_path), scene_files
+                    )
+                target = targets[index] + sum(targets[missing] for missing in gap)
+                gap = []
+                fitted_path, duration = fit_scene(video_path, target, offset, srt_path)
+                offset += duration
+                scene_videos.append(fitted_path)
+                if live_playlist:
+                    live_playlist = publish_scene(live_playlist, fitted_path, narration_path, on_progress)
         
         if not scene_videos:
             print("❌ No scenes were successfully rendered")
             return None
+        if gap:
+            # The last scenes failed: hold the last rendered frame over their narration.
+            # The scenes before are already live, so the hold is a clip of its own
+            print(f"📐 Holding the last rendered scene over {len(gap)} failed scene(s)")
+            hold_path, _ = hold_scene_end(
+                scene_videos[-1], sum(targets[missing] for missing in gap), offset, srt_path
+            )
+            scene_videos.append(hold_path)
+            if live_playlist:
+                live_playlist = publish_scene(live_playlist, hold_path, narration_path, on_progress)
+        if on_progress:
+            on_progress(stage="mux")
         
-        # Concatenate all scene videos
+        # Scenes already match the narration - concatenate and add the voiceover without re-encoding video
         print(f"🔗 Concatenating {len(scene_videos)} scenes...")
-        concatenated_video = concatenate_videos(scene_videos)
-        
-        if not concatenated_video:
-            print("❌ Failed to concatenate videos")
-            return None
-        
-        # Generate voiceover
-        narration_path = generate_voiceover(explanation)
-        
-        # Merge concatenated video with voiceover and subtitles (no looping for multi-scene)
-        final_output = add_voiceover_to_multiscene_video(
-            concatenated_video, 
-            narration_path,
-            add_subtitles=True,
-            subtitle_text=explanation
-        )
+        final_output = concat_and_mux_scenes(scene_videos, narration_path, output_dir=workspace)
         
         if final_output:
             print(f"🎉 Multi-scene video ready at: {final_output}")
             return final_output
         else:
-            print("⚠️ Could not merge voiceover with concatenated video.")
+            print("⚠️ Could not merge voiceover with scene videos.")
             return None
             
     except subprocess.CalledProcessError as e:
@@ -953,128 +2013,61 @@ def run_multi_scene_manim(temp_file_path, scene_classes, explanation):
     except subprocess.TimeoutExpired:
         print("⏱ Multi-scene Manim command timed out.")
         return None
+    finally:
+        # However the job ends, players that got the playlist must see it end
+        if playlist:
+            playlist.finish()
 
 
-def add_voiceover_to_multiscene_video(video_path, audio_path, add_subtitles=False, subtitle_text=None):
+def concat_and_mux_scenes(video_paths, audio_path, output_dir=os.path.join("media", "videos")):
     """
-    Add voiceover to multi-scene video without looping.
-    For multi-scene videos, we don't want to loop since we have enough content.
+    Concatenate fitted scene videos and add the voiceover in one ffmpeg pass.
+    Scenes were already timed to the narration (with subtitles burned in) by
+    fit_scene, so the video is stream-copied - no looping, padding or re-encode.
     """
-    if not os.path.exists(video_path):
-        print(f"❌ Video not found at: {video_path}")
-        return None
-
-    output_path = video_path.replace(".mp4", "_with_voiceover.mp4")
-    
-    # Get audio duration for subtitle timing
-    srt_path = None
-    if add_subtitles and subtitle_text:
-        try:
-            from mutagen.mp3 import MP3
-            audio = MP3(audio_path)
-            audio_duration = audio.info.length
-            srt_path = generate_srt_file(subtitle_text, audio_duration)
-        except Exception as e:
-            print(f"⚠️ Could not generate subtitles: {e}")
-            srt_path = None
-
-    # Base ffmpeg command
-    command = [
-        "ffmpeg",
-        "-y",  # Overwrite without asking
-        "-i", video_path,
-        "-i", audio_path,
-    ]
-    
-    # Add subtitle filter if available
-    if srt_path and os.path.exists(srt_path):
-        srt_path_escaped = srt_path.replace('\\', '/').replace(':', '\\:')
-        command.extend([
-            "-vf", f"subtitles={srt_path_escaped}:force_style='FontSize=24,PrimaryColour=&HFFFFFF&,OutlineColour=&H000000&,BackColour=&H80000000&,Bold=1,Alignment=2,MarginV=20'",
-        ])
-        command.extend([
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            "-map", "0:v:0",
-            "-map", "1:a:0",
-            output_path
-        ])
-    else:
-        command.extend([
-            "-c:v", "copy",         # Copy video without re-encoding (faster)
-            "-c:a", "aac",          # Encode audio in AAC
-            "-map", "0:v:0",        # Use video from first input
-            "-map", "1:a:0",        # Use audio from second input
-            output_path
-        ])
-
-    try:
-        subtitle_status = " with subtitles" if srt_path else ""
-        print(f"🎞️ Adding voiceover{subtitle_status} to multi-scene video...")
-        subprocess.run(command, check=True, capture_output=True, text=True)
-        print(f"✅ Multi-scene video with voiceover saved at: {output_path}")
-        
-        # Clean up subtitle file
-        if srt_path and os.path.exists(srt_path):
-            try:
-                os.remove(srt_path)
-            except:
-                pass
-                
-        return output_path
-    except subprocess.CalledProcessError as e:
-        print(f"❌ ffmpeg failed: {e}")
+    if not video_paths:
         return None
 
+    timestamp = int(time.time())
+    prefix = "multi_scene" if len(video_paths) > 1 else "scene"
+    output_path = os.path.join(output_dir, f"{prefix}_{timestamp}_with_voiceover.mp4")
 
-def concatenate_videos(video_paths):
-    """Concatenate multiple video files using ffmpeg"""
-    if not video_paths:
-        return None
-    
-    if len(video_paths) == 1:
-        return video_paths[0]
-    
     # Create a temporary file list for ffmpeg concat
     import tempfile
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', dir=output_dir, delete=False) as f:
         for video_path in video_paths:
             f.write(f"file '{os.path.abspath(video_path)}'\n")
         concat_list_path = f.name
-    
-    # Output path for concatenated video
-    timestamp = int(time.time())
-    output_path = f"media/videos/multi_scene_{timestamp}.mp4"
-    
+    command = [
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0", "-i", concat_list_path,
+        "-i", audio_path,
+        "-c:v", "copy",         # Copy video without re-encoding (faster)
+        "-c:a", "aac",          # Encode audio in AAC
+        "-map", "0:v:0",        # Use video from the concatenated scenes
+        "-map", "1:a:0",        # Use audio from the narration
+        "-movflags", "+faststart",  # moov atom up front so playback starts before the download ends
+        output_path
+    ]
+
     try:
-        command = [
-            "ffmpeg", "-f", "concat", "-safe", "0", 
-            "-i", concat_list_path, 
-            "-c", "copy", 
-            output_path, "-y"
-        ]
-        
-        print(f"🔗 Running ffmpeg concatenation: {' '.join(command)}")
-        subprocess.run(command, capture_output=True, text=True, check=True)
-        
-        # Clean up temp file
-        os.unlink(concat_list_path)
-        
-        if os.path.exists(output_path):
-            print(f"✅ Videos concatenated successfully: {output_path}")
-            return output_path
-        else:
-            print("❌ Concatenated video not found")
-            return None
-            
+        print(f"🎞️ Concatenating {len(video_paths)} scene(s) and adding voiceover...")
+        with timed("concat_mux"):
+            subprocess.run(command, check=True, capture_output=True, text=True)
+        observe_size("final_video", os.path.getsize(output_path))
+        print(f"✅ Video with voiceover saved at: {output_path}")
+        return output_path
     except subprocess.CalledProcessError as e:
-        print(f"❌ FFmpeg concatenation error: {e}")
-        print("Output:", e.stdout)
+        print(f"❌ ffmpeg failed: {e}")
         print("Errors:", e.stderr)
-        # Clean up temp file
-        if os.path.exists(concat_list_path):
-            os.unlink(concat_list_path)
         return None
+    finally:
+        # Clean up the concat list (the SRT stays in the workspace for the final render)
+        if os.path.exists(concat_list_path):
+            try:
+                os.remove(concat_list_path)
+            except OSError:
+                pass
 
 
 
@@ -1094,7 +2087,7 @@ if __name__ == "__main__":
                 print("speak...")
                 audio = recognizer.record(source, duration=10)
 
-                speech_text = recognizer.recognize_google(audio)
+                speech_text = recognize_speech(audio)
                 print(f"🗣 Recognized: {speech_text}")
                 if not process_speech(speech_text):
                     break
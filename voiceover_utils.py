@@ -1,25 +1,103 @@
 # voiceover_utils.py
 
 import os
+import re
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from gtts import gTTS
 import tempfile
 from mutagen.mp3 import MP3
+from cache_utils import DiskCache, hash_key
+from metrics_utils import timed, observe_size, track_cache
 
 
-def generate_voiceover(text):
+# Sentence-level MP3 segments keyed by (sentence text, language)
+TTS_WORKERS = int(os.environ.get("VOICEMATION_TTS_WORKERS", "8"))
+TTS_CACHE_MAX_BYTES = int(os.environ.get("VOICEMATION_TTS_CACHE_MB", "256")) * 1024 * 1024
+tts_cache = DiskCache("tts", TTS_CACHE_MAX_BYTES, suffix=".mp3")
+track_cache(tts_cache)
+
+
+# Burned-in subtitle look shared by every mux path
+SUBTITLE_FORCE_STYLE = "FontSize=24,PrimaryColour=&HFFFFFF&,OutlineColour=&H000000&,BackColour=&H80000000&,Bold=1,Alignment=2,MarginV=20"
+
+
+def subtitle_filter(srt_path):
+    """ffmpeg `subtitles` filter for an SRT file (path escaped for filter syntax)"""
+    srt_path_escaped = srt_path.replace('\\', '/').replace(':', '\\:')
+    return f"subtitles={srt_path_escaped}:force_style='{SUBTITLE_FORCE_STYLE}'"
+
+
+def split_sentences(text):
+    """Split narration into sentences (same chunking as the subtitles)"""
+    return [s.strip() for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s.strip()]
+
+
+def synthesize_sentence(sentence, lang="en"):
+    """Return the path of an MP3 for one sentence, synthesizing it only on a cache miss."""
+    key = hash_key(sentence, lang)
+    cached_path = tts_cache.get_path(key)
+    if cached_path:
+        return cached_path
+
+    fd, segment_path = tempfile.mkstemp(suffix=".mp3")
+    os.close(fd)
+    try:
+        gTTS(sentence, lang=lang).save(segment_path)
+        return tts_cache.put_file(key, segment_path)
+    finally:
+        os.remove(segment_path)
+
+
+def concat_mp3_segments(segment_paths, output_path):
+    """Join MP3 segments with ffmpeg's concat demuxer (stream copy, no re-encode)."""
+    if len(segment_paths) == 1:
+        shutil.copyfile(segment_paths[0], output_path)
+        return output_path
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+        for segment_path in segment_paths:
+            f.write(f"file '{os.path.abspath(segment_path)}'\n")
+        concat_list_path = f.name
+
+    try:
+        subprocess.run(
+            ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_list_path, "-c", "copy", output_path],
+            check=True, capture_output=True, text=True
+        )
+    finally:
+        os.unlink(concat_list_path)
+    return output_path
+
+
+def generate_voiceover(text, lang="en", output_dir=None):
     """
     Convert input text to speech using gTTS and save as MP3.
-    Returns path to the saved file.
+    Sentences are synthesized concurrently and cached individually, then
+    stitched together without re-encoding.
+    Returns path to the saved file (in output_dir, default: the temp dir).
     """
-    tts = gTTS(text)
-    temp_audio_path = os.path.join(tempfile.gettempdir(), "voiceover.mp3")
-    tts.save(temp_audio_path)
-    print(f"🔊 Voiceover saved to: {temp_audio_path}")
+    temp_audio_path = os.path.join(output_dir or tempfile.gettempdir(), "voiceover.mp3")
+    sentences = split_sentences(text) or [text]
+
+    workers = max(1, min(len(sentences), TTS_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts") as pool:
+        segment_paths = list(pool.map(lambda sentence: synthesize_sentence(sentence, lang), sentences))
+
+    try:
+        concat_mp3_segments(segment_paths, temp_audio_path)
+    except subprocess.CalledProcessError as e:
+        # Fall back to a single whole-text request if the stitch fails
+        print(f"⚠️ Could not stitch voiceover segments ({e}); synthesizing in one pass")
+        gTTS(text, lang=lang).save(temp_audio_path)
+
+    stats = tts_cache.stats()
+    print(f"🔊 Voiceover saved to: {temp_audio_path} ({len(sentences)} sentences, cache hits: {stats['hits']})")
     return temp_audio_path
 
 
-def generate_srt_file(text, audio_duration):
+def generate_srt_file(text, audio_duration, output_dir=None):
     """
     Generate SRT subtitle file from text with timing based on audio duration.
     Returns path to the SRT file.
@@ -36,7 +114,7 @@ def generate_srt_file(text, audio_duration):
         time_per_sentence = audio_duration / len(sentences)
         
         # Create SRT file
-        srt_path = os.path.join(tempfile.gettempdir(), "subtitles.srt")
+        srt_path = os.path.join(output_dir or tempfile.gettempdir(), "subtitles.srt")
         
         with open(srt_path, 'w', encoding='utf-8') as f:
             current_time = 0.0
@@ -75,78 +153,19 @@ def format_srt_time(seconds):
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
 
-def add_voiceover_to_video(video_path, audio_path, add_subtitles=False, subtitle_text=None):
+def prepare_narration(text, output_dir=None):
     """
-    Use ffmpeg to merge video and audio into a new output file.
-    Ensures video matches the length of the narration:
-      - If audio is longer → video loops until narration ends
-      - If video is longer → video trims to narration length
-    
-    Args:
-        video_path: Path to the video file
-        audio_path: Path to the audio file
-        add_subtitles: Whether to add subtitles (default: False)
-        subtitle_text: Text for subtitles (required if add_subtitles=True)
-    
-    Returns path to the final merged video.
+    Narration stage of the pipeline: synthesize the voiceover, then time the
+    subtitles against it. Depends only on the explanation text, so it runs
+    alongside the scene renders.
+    Returns (audio_path, srt_path); srt_path is None if subtitles failed.
     """
-    if not os.path.exists(video_path):
-        print(f"❌ Video not found at: {video_path}")
-        return None
-
-    output_path = video_path.replace(".mp4", "_vo.mp4")
-    
-    # Get audio duration for subtitle timing
-    srt_path = None
-    if add_subtitles and subtitle_text:
-        try:
-            audio = MP3(audio_path)
-            audio_duration = audio.info.length
-            srt_path = generate_srt_file(subtitle_text, audio_duration)
-        except Exception as e:
-            print(f"⚠️ Could not generate subtitles: {e}")
-            srt_path = None
-
-    # Base ffmpeg command
-    command = [
-        "ffmpeg",
-        "-y",  # Overwrite without asking
-        "-stream_loop", "-1",  # Loop video if shorter than audio
-        "-i", video_path,
-        "-i", audio_path,
-    ]
-    
-    # Add subtitle filter if available
-    if srt_path and os.path.exists(srt_path):
-        # Escape path for ffmpeg subtitle filter
-        srt_path_escaped = srt_path.replace('\\', '/').replace(':', '\\:')
-        command.extend([
-            "-vf", f"subtitles={srt_path_escaped}:force_style='FontSize=24,PrimaryColour=&HFFFFFF&,OutlineColour=&H000000&,BackColour=&H80000000&,Bold=1,Alignment=2,MarginV=20'",
-        ])
-    
-    command.extend([
-        "-c:v", "libx264",      # Re-encode video for compatibility
-        "-tune", "animation",   # Optimize for animation
-        "-c:a", "aac",          # Encode audio in AAC
-        "-shortest",            # Trim longer stream to match shorter
-        output_path
-    ])
-
+    with timed("tts"):
+        audio_path = generate_voiceover(text, output_dir=output_dir)
+    observe_size("narration_audio", os.path.getsize(audio_path))
     try:
-        subtitle_status = " with subtitles" if srt_path else ""
-        print(f"🎞️ Merging video and voiceover{subtitle_status} using ffmpeg...")
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print(f"✅ Final video with voiceover saved at: {output_path}")
-        
-        # Clean up subtitle file
-        if srt_path and os.path.exists(srt_path):
-            try:
-                os.remove(srt_path)
-            except:
-                pass
-                
-        return output_path
-    except subprocess.CalledProcessError as e:
-        print(f"❌ ffmpeg failed: {e}")
-        print(f"Error output: {e.stderr}")
-        return None
+        srt_path = generate_srt_file(text, MP3(audio_path).info.length, output_dir)
+    except Exception as e:
+        print(f"⚠️ Could not generate subtitles: {e}")
+        srt_path = None
+    return audio_path, srt_path
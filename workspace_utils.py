@@ -0,0 +1,35 @@
+# workspace_utils.py
+
+import os
+import shutil
+import time
+import uuid
+
+
+# Every pipeline run gets its own directory under here, so concurrent jobs
+# never share Manim sources, media dirs, narration or subtitle files.
+WORKSPACE_ROOT = os.environ.get("VOICEMATION_WORKSPACE_DIR", os.path.join("media", "workspaces"))
+WORKSPACE_TTL_SECONDS = int(os.environ.get("VOICEMATION_WORKSPACE_TTL", str(6 * 3600)))
+
+
+def create_workspace(workspace_id=None):
+    """Create and return a fresh workspace directory (relative to the server root)."""
+    prune_workspaces()
+    workspace_id = workspace_id or uuid.uuid4().hex
+    workspace = os.path.join(WORKSPACE_ROOT, workspace_id)
+    os.makedirs(workspace, exist_ok=True)
+    print(f"📂 Workspace: {workspace}")
+    return workspace
+
+
+def prune_workspaces(max_age=WORKSPACE_TTL_SECONDS):
+    """Delete workspaces (and the videos in them) older than max_age seconds."""
+    if not os.path.isdir(WORKSPACE_ROOT):
+        return
+    cutoff = time.time() - max_age
+    for entry in os.scandir(WORKSPACE_ROOT):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass